@@ -7,16 +7,26 @@ __version__ = "1.0.0"
 __author__ = "MCP TTS Developer"
 __description__ = "Local and online text-to-speech MCP server with multi-engine support"
 
-# Import main components
-try:
-    from .server import OfflineTextToSpeechServer
-except ImportError:
-    OfflineTextToSpeechServer = None
+import importlib
 
-try:
-    from .server_online import OnlineTextToSpeechServer
-except ImportError:
-    OnlineTextToSpeechServer = None
+# Main components are imported lazily (PEP 562) so that importing the package
+# only loads the dependencies of the server that is actually used
+_LAZY_ATTRS = {
+    "OfflineTextToSpeechServer": ".server",
+    "OnlineTextToSpeechServer": ".server_online",
+}
+
+def __getattr__(name):
+    """Import server classes on first access"""
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        value = getattr(importlib.import_module(module_name, __name__), name)
+    except ImportError:
+        value = None
+    globals()[name] = value
+    return value
 
 __all__ = [
     "OfflineTextToSpeechServer",
@@ -5,271 +5,327 @@ Falls back gracefully from offline engines to online services
 """
 
 import asyncio
+import functools
 import logging
 import os
+import platform
+import shutil
 import sys
 import subprocess
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from .utils import module_available
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared subprocess.run options for probes: a non-zero exit is reported, not raised
+_PROBE_KW = {'capture_output': True, 'text': True, 'timeout': 5, 'check': False}
+
+@functools.lru_cache(maxsize=1)
+def _load_env_creds() -> dict:
+    """Read cloud credential environment variables once per process"""
+    env = os.environ
+    return {
+        'azure': bool(env.get('AZURE_SPEECH_KEY') and env.get('AZURE_SPEECH_REGION')),
+        'polly': bool(env.get('AWS_ACCESS_KEY_ID') and env.get('AWS_SECRET_ACCESS_KEY')),
+        'watson': bool(env.get('IBM_WATSON_APIKEY') and env.get('IBM_WATSON_URL')),
+    }
+
+@functools.lru_cache(maxsize=None)
+def find_executable(name: str) -> Optional[str]:
+    """Locate an engine executable on PATH without spawning it"""
+    return shutil.which(name)
+
+@functools.lru_cache(maxsize=None)
+def get_executable_version(name: str) -> str:
+    """Get the first line of `<name> --version` (only run when actually displayed)"""
+    path = find_executable(name)
+    if not path:
+        return "unknown"
+    try:
+        result = subprocess.run([path, '--version'], **_PROBE_KW)
+    except Exception as e:
+        return f"unknown ({e})"
+    if result.returncode != 0:
+        return "unknown"
+    return result.stdout.strip().split('\n')[0]
+
+@functools.lru_cache(maxsize=1)
+def _get_pyttsx3_voices() -> str:
+    """Count pyttsx3 voices (initializes the platform speech driver, so only used for display)"""
+    try:
+        import pyttsx3
+        voices = pyttsx3.init().getProperty('voices')
+        return str(len(voices) if voices else 0)
+    except Exception as e:
+        return f"unknown ({e})"
+
+@functools.lru_cache(maxsize=1)
 def detect_platform() -> str:
-    """Detect the current platform and architecture"""
-    import platform
-    
+    """Detect the current platform and architecture (computed and logged once)"""
     system = platform.system().lower()
     machine = platform.machine().lower()
     
     platform_info = f"{system}-{machine}"
-    logger.info(f"🔍 Detected platform: {platform_info}")
+    logger.info("🔍 Detected platform: %s", platform_info)
     
     return platform_info
 
-def check_offline_tts_engines() -> dict:
-    """Check which offline TTS engines are available"""
-    engines = {}
-    
-    # Check pyttsx3 (cross-platform)
-    try:
-        import pyttsx3
-        engine = pyttsx3.init()
-        voices = engine.getProperty('voices')
-        engines['pyttsx3'] = {
-            'available': True,
-            'voices': len(voices) if voices else 0,
-            'platform': 'cross-platform'
-        }
+@dataclass(slots=True, frozen=True)
+class EngineStatus:
+    """Result of probing a single offline engine or online service"""
+    available: bool
+    platform: str = ''
+    quality: str = ''
+    error: str = ''
+    path: Optional[str] = None
+    voices: Optional[int] = None
+    ai_models: bool = False
+    free: bool = False
+    module_installed: bool = True
+    credentials_configured: bool = True
+
+@functools.lru_cache(maxsize=1)
+def probe_pyttsx3() -> EngineStatus:
+    """Probe pyttsx3 (cross-platform); the driver is only initialized on demand"""
+    # On Linux pyttsx3 drives espeak; without it init() can only fail
+    if sys.platform.startswith('linux') and not any(
+            find_executable(name) for name in ('espeak', 'espeak-ng', 'festival')):
+        logger.info("❌ pyttsx3 not available: no Linux TTS driver (espeak/festival)")
+        return EngineStatus(available=False, error='no Linux TTS driver (install espeak)')
+    if module_available('pyttsx3'):
         logger.info("✅ pyttsx3 available")
-    except Exception as e:
-        logger.info(f"❌ pyttsx3 not available: {e}")
-        engines['pyttsx3'] = {'available': False, 'error': str(e)}
-    
-    # Check espeak (Linux)
-    try:
-        result = subprocess.run(['espeak', '--version'], 
-                              capture_output=True, text=True, timeout=5)
-        if result.returncode == 0:
-            engines['espeak'] = {
-                'available': True,
-                'version': result.stdout.strip().split('\n')[0],
-                'platform': 'linux'
-            }
-            logger.info("✅ espeak available")
-        else:
-            engines['espeak'] = {'available': False, 'error': 'Command failed'}
-    except Exception as e:
-        engines['espeak'] = {'available': False, 'error': str(e)}
-    
-    # Check festival (Linux)
-    try:
-        result = subprocess.run(['festival', '--version'], 
-                              capture_output=True, text=True, timeout=5)
-        engines['festival'] = {
-            'available': result.returncode == 0,
-            'platform': 'linux'
-        }
-        if result.returncode == 0:
-            logger.info("✅ festival available")
-    except Exception as e:
-        engines['festival'] = {'available': False, 'error': str(e)}
-    
-    # Check Coqui TTS
-    try:
-        from TTS.api import TTS
-        engines['coqui'] = {
-            'available': True,
-            'platform': 'cross-platform',
-            'ai_models': True
-        }
+        return EngineStatus(available=True, platform='cross-platform')
+    logger.info("❌ pyttsx3 not available: No module named 'pyttsx3'")
+    return EngineStatus(available=False, error="No module named 'pyttsx3'")
+
+@functools.lru_cache(maxsize=1)
+def probe_espeak() -> EngineStatus:
+    """Probe espeak (Linux)"""
+    espeak_path = find_executable('espeak')
+    if espeak_path:
+        logger.info("✅ espeak available")
+        return EngineStatus(available=True, path=espeak_path, platform='linux')
+    return EngineStatus(available=False, error='espeak not found on PATH')
+
+@functools.lru_cache(maxsize=1)
+def probe_festival() -> EngineStatus:
+    """Probe festival (Linux)"""
+    festival_path = find_executable('festival')
+    if festival_path:
+        logger.info("✅ festival available")
+        return EngineStatus(available=True, path=festival_path, platform='linux')
+    return EngineStatus(available=False, error='festival not found on PATH')
+
+@functools.lru_cache(maxsize=1)
+def probe_coqui() -> EngineStatus:
+    """Probe Coqui TTS (torch is only imported once the server actually uses it)"""
+    if module_available('TTS.api'):
         logger.info("✅ Coqui TTS available")
-    except Exception as e:
-        engines['coqui'] = {'available': False, 'error': str(e)}
-    
-    return engines
+        return EngineStatus(available=True, platform='cross-platform', ai_models=True)
+    return EngineStatus(available=False, error="No module named 'TTS'")
 
-def check_online_tts_services() -> dict:
-    """Check which online TTS services are available"""
-    services = {}
-    
-    # Check gTTS
-    try:
-        from gtts import gTTS
-        services['gtts'] = {
-            'available': True,
-            'free': True,
-            'quality': 'good'
-        }
+@functools.lru_cache(maxsize=1)
+def probe_gtts() -> EngineStatus:
+    """Probe Google TTS"""
+    if module_available('gtts'):
         logger.info("✅ gTTS available")
-    except Exception as e:
-        services['gtts'] = {'available': False, 'error': str(e)}
-    
-    # Check Azure Speech Services
-    try:
-        import azure.cognitiveservices.speech as speechsdk
-        has_credentials = (os.getenv('AZURE_SPEECH_KEY') and 
-                          os.getenv('AZURE_SPEECH_REGION'))
-        services['azure'] = {
-            'available': has_credentials,
-            'module_installed': True,
-            'credentials_configured': has_credentials,
-            'quality': 'excellent'
-        }
-        if has_credentials:
-            logger.info("✅ Azure Speech Services available")
-        else:
-            logger.info("ℹ️  Azure Speech Services: credentials not configured")
-    except Exception as e:
-        services['azure'] = {
-            'available': False, 
-            'module_installed': False,
-            'error': str(e)
-        }
-    
-    # Check Amazon Polly
-    try:
-        import boto3
-        has_credentials = (os.getenv('AWS_ACCESS_KEY_ID') and 
-                          os.getenv('AWS_SECRET_ACCESS_KEY'))
-        services['polly'] = {
-            'available': has_credentials,
-            'module_installed': True,
-            'credentials_configured': has_credentials,
-            'quality': 'excellent'
-        }
-        if has_credentials:
-            logger.info("✅ Amazon Polly available")
-        else:
-            logger.info("ℹ️  Amazon Polly: AWS credentials not configured")
-    except Exception as e:
-        services['polly'] = {
-            'available': False,
-            'module_installed': False, 
-            'error': str(e)
-        }
-    
-    # Check IBM Watson
-    try:
-        from ibm_watson import TextToSpeechV1
-        has_credentials = (os.getenv('IBM_WATSON_APIKEY') and 
-                          os.getenv('IBM_WATSON_URL'))
-        services['watson'] = {
-            'available': has_credentials,
-            'module_installed': True,
-            'credentials_configured': has_credentials,
-            'quality': 'excellent'
-        }
-        if has_credentials:
-            logger.info("✅ IBM Watson TTS available")
-        else:
-            logger.info("ℹ️  IBM Watson: credentials not configured")
-    except Exception as e:
-        services['watson'] = {
-            'available': False,
-            'module_installed': False,
-            'error': str(e)
-        }
-    
-    return services
+        return EngineStatus(available=True, free=True, quality='good')
+    return EngineStatus(available=False, error="No module named 'gtts'")
 
-def select_best_server() -> str:
-    """Select the best available TTS server based on environment"""
-    platform = detect_platform()
-    offline_engines = check_offline_tts_engines()
-    online_services = check_online_tts_services()
-    
-    # Count available options
-    available_offline = sum(1 for engine in offline_engines.values() 
-                           if engine.get('available', False))
-    available_online = sum(1 for service in online_services.values() 
-                          if service.get('available', False))
+def _probe_cloud_service(module: str, service: str, ready_message: str,
+                         missing_credentials_message: str) -> EngineStatus:
+    """Probe a paid cloud service: SDK installed and credentials configured"""
+    if not module_available(module):
+        return EngineStatus(available=False, module_installed=False,
+                            error=f"No module named '{module}'")
+    has_credentials = _load_env_creds()[service]
+    if has_credentials:
+        logger.info(ready_message)
+    else:
+        logger.info(missing_credentials_message)
+    return EngineStatus(available=has_credentials,
+                        credentials_configured=has_credentials,
+                        quality='excellent')
+
+@functools.lru_cache(maxsize=1)
+def probe_azure() -> EngineStatus:
+    """Probe Azure Speech Services"""
+    return _probe_cloud_service('azure.cognitiveservices.speech', 'azure',
+                                "✅ Azure Speech Services available",
+                                "ℹ️  Azure Speech Services: credentials not configured")
+
+@functools.lru_cache(maxsize=1)
+def probe_polly() -> EngineStatus:
+    """Probe Amazon Polly"""
+    return _probe_cloud_service('boto3', 'polly',
+                                "✅ Amazon Polly available",
+                                "ℹ️  Amazon Polly: AWS credentials not configured")
+
+@functools.lru_cache(maxsize=1)
+def probe_watson() -> EngineStatus:
+    """Probe IBM Watson"""
+    return _probe_cloud_service('ibm_watson', 'watson',
+                                "✅ IBM Watson TTS available",
+                                "ℹ️  IBM Watson: credentials not configured")
+
+# Probe registries, in display order
+OFFLINE_PROBES = {
+    'pyttsx3': probe_pyttsx3,
+    'espeak': probe_espeak,
+    'festival': probe_festival,
+    'coqui': probe_coqui,
+}
+
+ONLINE_PROBES = {
+    'gtts': probe_gtts,
+    'azure': probe_azure,
+    'polly': probe_polly,
+    'watson': probe_watson,
+}
+
+def _run_probes(probes: dict) -> dict:
+    """Run independent probes concurrently, keeping registry order in the result
+    
+    Each probe is memoized, so backends already probed during selection
+    are not probed again here.
+    """
+    with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+        futures = {name: pool.submit(probe) for name, probe in probes.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+@functools.lru_cache(maxsize=1)
+def check_offline_tts_engines() -> Dict[str, EngineStatus]:
+    """Check which offline TTS engines are available (probed once per process)"""
+    return _run_probes(OFFLINE_PROBES)
+
+@functools.lru_cache(maxsize=1)
+def check_online_tts_services() -> Dict[str, EngineStatus]:
+    """Check which online TTS services are available (probed once per process)"""
+    return _run_probes(ONLINE_PROBES)
+
+# Selection priority and the message logged when each one wins
+OFFLINE_PRIORITY = {
+    'coqui': "🚀 Selected Coqui TTS (AI-based, excellent quality)",
+    'pyttsx3': "🚀 Selected pyttsx3 (cross-platform, good quality)",
+    'espeak': "🚀 Selected espeak (Linux native, basic quality)",
+    'festival': "🚀 Selected festival (Linux native, basic quality)",
+}
+
+ONLINE_PRIORITY = {
+    'gtts': "🚀 Selected Google TTS (free, good quality)",
+    'azure': "🚀 Selected Azure Speech (paid, excellent quality)",
+    'polly': "🚀 Selected Amazon Polly (paid, excellent quality)",
+    'watson': "🚀 Selected IBM Watson (paid, excellent quality)",
+}
+
+def _pick_first_available(priority: dict, probes: dict, results: Optional[dict]) -> Optional[str]:
+    """Return the first available backend in priority order, reusing probe results if given"""
+    for name in priority:
+        info = results.get(name) if results is not None else probes[name]()
+        if info is not None and info.available:
+            return name
+    return None
+
+def pick_offline_engine(offline_engines: Optional[dict] = None) -> Optional[str]:
+    """Return the highest-priority offline engine, probing only until one is found"""
+    return _pick_first_available(OFFLINE_PRIORITY, OFFLINE_PROBES, offline_engines)
+
+def pick_online_service(online_services: Optional[dict] = None) -> Optional[str]:
+    """Return the highest-priority online service, probing only until one is found"""
+    return _pick_first_available(ONLINE_PRIORITY, ONLINE_PROBES, online_services)
+
+def clear_probe_caches():
+    """Discard all memoized probe results so the next lookup re-probes"""
+    for probe in (*OFFLINE_PROBES.values(), *ONLINE_PROBES.values()):
+        probe.cache_clear()
+    for cached in (check_offline_tts_engines, check_online_tts_services, _load_env_creds,
+                   find_executable, get_executable_version, _get_pyttsx3_voices):
+        cached.cache_clear()
+
+def probe_environment() -> tuple:
+    """Run the full probe pass, for callers that display as well as select"""
+    return detect_platform(), check_offline_tts_engines(), check_online_tts_services()
+
+def select_best_server(offline_engines: Optional[dict] = None,
+                       online_services: Optional[dict] = None) -> str:
+    """Select the best available TTS server based on environment
     
-    logger.info(f"📊 Available engines: {available_offline} offline, {available_online} online")
+    Pass the results of a previous full probe pass to avoid probing again;
+    otherwise backends are probed lazily in priority order.
+    """
+    detect_platform()
     
     # Decision logic: prefer offline engines for privacy and no API costs
-    if available_offline > 0:
+    offline_engine = pick_offline_engine(offline_engines)
+    if offline_engine:
         logger.info("🎯 Using offline TTS server (privacy-focused, no API costs)")
-        
-        # Prefer high-quality offline engines
-        if offline_engines.get('coqui', {}).get('available', False):
-            logger.info("🚀 Selected Coqui TTS (AI-based, excellent quality)")
-        elif offline_engines.get('pyttsx3', {}).get('available', False):
-            logger.info("🚀 Selected pyttsx3 (cross-platform, good quality)")
-        elif offline_engines.get('espeak', {}).get('available', False):
-            logger.info("🚀 Selected espeak (Linux native, basic quality)")
-        
+        logger.info(OFFLINE_PRIORITY[offline_engine])
         return "offline"
     
-    elif available_online > 0:
+    # Fall back to online services, preferring free ones
+    online_service = pick_online_service(online_services)
+    if online_service:
         logger.info("🌐 Using online TTS server (requires internet)")
-        
-        # Prefer free online services
-        if online_services.get('gtts', {}).get('available', False):
-            logger.info("🚀 Selected Google TTS (free, good quality)")
-        elif online_services.get('azure', {}).get('available', False):
-            logger.info("🚀 Selected Azure Speech (paid, excellent quality)")
-        elif online_services.get('polly', {}).get('available', False):
-            logger.info("🚀 Selected Amazon Polly (paid, excellent quality)")
-        elif online_services.get('watson', {}).get('available', False):
-            logger.info("🚀 Selected IBM Watson (paid, excellent quality)")
-        
+        logger.info(ONLINE_PRIORITY[online_service])
         return "online"
     
-    else:
-        logger.error("❌ No TTS engines or services available!")
-        logger.error("💡 Install dependencies: pip install pyttsx3 gtts")
-        logger.error("💡 Or configure cloud service credentials")
-        return "none"
-
-def print_environment_info():
-    """Print detailed environment information"""
-    platform = detect_platform()
-    offline_engines = check_offline_tts_engines()
-    online_services = check_online_tts_services()
+    logger.error("❌ No TTS engines or services available!")
+    logger.error("💡 Install dependencies: pip install pyttsx3 gtts")
+    logger.error("💡 Or configure cloud service credentials")
+    return "none"
+
+def print_environment_info(platform_name: str, offline_engines: dict, online_services: dict):
+    """Print detailed environment information from a probe pass (as a single write)"""
+    report = []
+    out = report.append
     
-    print("\n" + "="*60)
-    print("🎤 MCP Text-to-Speech Server - Environment Analysis")
-    print("="*60)
+    out("\n" + "="*60)
+    out("🎤 MCP Text-to-Speech Server - Environment Analysis")
+    out("="*60)
     
-    print(f"\n🖥️  Platform: {platform}")
+    out(f"\n🖥️  Platform: {platform_name}")
     
-    print("\n🔧 Offline TTS Engines:")
+    out("\n🔧 Offline TTS Engines:")
     for engine, info in offline_engines.items():
-        status = "✅" if info.get('available', False) else "❌"
-        platform_info = info.get('platform', 'unknown')
-        print(f"   {status} {engine} ({platform_info})")
-        if not info.get('available', False):
-            print(f"      Error: {info.get('error', 'Unknown')}")
-        elif engine == 'pyttsx3' and 'voices' in info:
-            print(f"      Voices: {info['voices']}")
-    
-    print("\n🌐 Online TTS Services:")
+        status = "✅" if info.available else "❌"
+        out(f"   {status} {engine} ({info.platform or 'unknown'})")
+        if not info.available:
+            out(f"      Error: {info.error or 'Unknown'}")
+        elif engine == 'pyttsx3':
+            out(f"      Voices: {_get_pyttsx3_voices()}")
+        elif info.path:
+            out(f"      Version: {get_executable_version(engine)}")
+    
+    out("\n🌐 Online TTS Services:")
     for service, info in online_services.items():
-        status = "✅" if info.get('available', False) else "❌"
-        quality = info.get('quality', 'unknown')
-        print(f"   {status} {service} ({quality} quality)")
-        if not info.get('available', False):
-            if not info.get('module_installed', True):
-                print(f"      Module not installed: {info.get('error', '')}")
-            elif not info.get('credentials_configured', True):
-                print(f"      Credentials not configured")
+        status = "✅" if info.available else "❌"
+        out(f"   {status} {service} ({info.quality or 'unknown'} quality)")
+        if not info.available:
+            if not info.module_installed:
+                out(f"      Module not installed: {info.error}")
+            elif not info.credentials_configured:
+                out(f"      Credentials not configured")
     
-    available_offline = sum(1 for engine in offline_engines.values() 
-                           if engine.get('available', False))
-    available_online = sum(1 for service in online_services.values() 
-                          if service.get('available', False))
+    available_offline = sum(1 for engine in offline_engines.values() if engine.available)
+    available_online = sum(1 for service in online_services.values() if service.available)
     
-    print(f"\n📊 Summary: {available_offline} offline engines, {available_online} online services")
+    out(f"\n📊 Summary: {available_offline} offline engines, {available_online} online services")
     
     if available_offline == 0 and available_online == 0:
-        print("\n❌ No TTS engines available!")
-        print("💡 Quick setup:")
-        print("   pip install pyttsx3 gtts")
-        print("   # For advanced AI voices:")
-        print("   pip install TTS")
+        out("\n❌ No TTS engines available!")
+        out("💡 Quick setup:")
+        out("   pip install pyttsx3 gtts")
+        out("   # For advanced AI voices:")
+        out("   pip install TTS")
+    
+    out("="*60 + "\n")
     
-    print("="*60 + "\n")
+    sys.stdout.write("\n".join(report) + "\n")
 
 async def run_offline_server():
     """Run the offline TTS server"""
@@ -278,7 +334,7 @@ async def run_offline_server():
         server = OfflineTextToSpeechServer()
         await server.run_server()
     except ImportError as e:
-        logger.error(f"Failed to import offline server: {e}")
+        logger.error("Failed to import offline server: %s", e)
         raise
 
 async def run_online_server():
@@ -288,20 +344,24 @@ async def run_online_server():
         server = OnlineTextToSpeechServer()
         await server.run_server()
     except ImportError as e:
-        logger.error(f"Failed to import online server: {e}")
+        logger.error("Failed to import online server: %s", e)
         raise
 
 async def main():
     """Main entry point with auto-detection"""
     
+    # Full probe results, shared by the display and selection paths
+    environment = None
+    
     # Check for debug flag
     if "--debug" in sys.argv or "-d" in sys.argv:
         logging.getLogger().setLevel(logging.DEBUG)
-        print_environment_info()
+        environment = probe_environment()
+        print_environment_info(*environment)
     
     # Check for info flag
     if "--info" in sys.argv or "-i" in sys.argv:
-        print_environment_info()
+        print_environment_info(*(environment or probe_environment()))
         return
     
     # Check for force flags
@@ -317,7 +377,11 @@ async def main():
     
     # Auto-detect best server
     logger.info("🔍 Auto-detecting best TTS server...")
-    server_type = select_best_server()
+    if environment:
+        _, offline_engines, online_services = environment
+        server_type = select_best_server(offline_engines, online_services)
+    else:
+        server_type = select_best_server()
     
     if server_type == "offline":
         await run_offline_server()
@@ -325,7 +389,7 @@ async def main():
         await run_online_server()
     else:
         logger.error("❌ No TTS servers available")
-        print_environment_info()
+        print_environment_info(*(environment or probe_environment()))
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -334,5 +398,5 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         logger.info("👋 Server stopped by user")
     except Exception as e:
-        logger.error(f"💥 Server crashed: {e}")
+        logger.error("💥 Server crashed: %s", e)
         sys.exit(1)
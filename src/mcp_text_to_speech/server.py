@@ -4,106 +4,569 @@ Uses multiple TTS engines for completely local speech synthesis
 No internet connection or API keys required for basic functionality
 """
 
+from __future__ import annotations
+
 import asyncio
+import ctypes
+import ctypes.util
+import functools
+import hashlib
 import json
 import logging
 import os
+import secrets
+import struct
+import subprocess
+import sys
 import tempfile
+import threading
 import uuid
-from typing import Any, Optional, List
-import io
+import wave
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # MCP imports
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
-from mcp.types import (
-    CallToolRequest, 
-    CallToolResult, 
-    ListToolsRequest, 
-    ListToolsResult, 
-    Tool,
-    TextContent,
-    JSONRPCMessage,
-    ErrorData,
-)
+from mcp.types import Tool, TextContent
+
+from .utils import chunk_text, copy_file, module_available, user_cache_dir, user_output_dir
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _dumps(obj) -> str:
+    """Serialize a tool response as compact JSON (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+# Preferred pyttsx3 voice name/id fragments per Chinese language code, in order
+CHINESE_VOICE_PREFERENCES = {
+    'yue': ['sinji', 'zh_hk'],          # Cantonese preferences
+    'zh-hk': ['sinji', 'zh_hk'],        # Hong Kong
+    'cantonese': ['sinji', 'zh_hk'],    # Cantonese
+    'zh-cn': ['tingting', 'zh_cn'],     # Mandarin (China)
+    'zh-tw': ['meijia', 'zh_tw'],       # Mandarin (Taiwan)
+    'zh': ['tingting', 'zh_cn'],        # Default Chinese
+    'chinese': ['tingting', 'zh_cn']    # Generic Chinese
+}
+
+# Common Chinese variants mapped to the language codes gTTS supports
+GTTS_LANGUAGE_MAP = {
+    'zh-hk': 'yue',        # Hong Kong -> Cantonese
+    'zh-yue': 'yue',       # Yue -> Cantonese  
+    'cantonese': 'yue',    # Cantonese -> yue
+    'zh-cn': 'zh-CN',      # Simplified Chinese
+    'zh-tw': 'zh-TW',      # Traditional Chinese
+    'zh': 'zh',            # Mandarin Chinese
+    'chinese': 'zh'        # Default Chinese -> Mandarin
+}
+
+# How long a request waits for an engine that is still being detected
+ENGINE_PROBE_TIMEOUT = 30.0
+
+# Engines tried for "auto", best first
+ENGINE_SELECTION_ORDER = ('pyttsx3', 'coqui', 'espeak', 'gtts')
+
+# Recommendation shown for the first available engine, in order
+ENGINE_RECOMMENDATIONS = {
+    'pyttsx3': "pyttsx3 (best offline option)",
+    'espeak': "espeak (Linux offline)",
+    'coqui': "coqui (AI-based offline)",
+    'gtts': "gtts (requires internet, excellent quality)",
+}
+
+# Neural models hold hundreds of MB each; bound how many stay loaded
+MAX_COQUI_MODELS = 2
+
+# Synthesis workers per engine: pyttsx3 drives one shared, non-thread-safe driver and
+# Coqui shares loaded models, so both run one job at a time; stateless engines fan out
+ENGINE_WORKERS = {
+    'pyttsx3': 1,
+    'coqui': 1,
+    'espeak': min(8, os.cpu_count() or 1),
+    'gtts': min(8, os.cpu_count() or 1),
+}
+
+# Engines whose objects must stay on the thread that created them (SAPI COM,
+# NSSpeechSynthesizer); their probe and every synthesis run on one dedicated thread
+THREAD_AFFINE_ENGINES = frozenset({'pyttsx3', 'coqui'})
+
+def _stat_output(output_file: str) -> tuple[bool, int]:
+    """Check a synthesizer's output with a single stat: (non-empty, size in bytes)"""
+    try:
+        size = os.stat(output_file).st_size
+    except FileNotFoundError:
+        return False, 0
+    return size > 0, size
+
+# Long texts are split at sentence ends and the chunks synthesized in parallel (only for
+# engines that write WAV, so the pieces can be joined with the wave module, and run several
+# workers; Coqui runs one job at a time, so chunking would only add pauses and break prosody)
+CHUNK_MAX_CHARS = 150
+CHUNK_SILENCE_SECONDS = 0.3
+CHUNKABLE_ENGINES = frozenset({'espeak'})
+
+# (channels, sample width in bytes, frame rate) of a PCM stream
+PcmFormat = tuple[int, int, int]
+
+def _read_wav_pcm(file_path: str) -> tuple[PcmFormat, bytes]:
+    """Read a WAV file's format and raw PCM frames"""
+    with wave.open(file_path, 'rb') as wav_file:
+        pcm_format = (wav_file.getnchannels(), wav_file.getsampwidth(), wav_file.getframerate())
+        return pcm_format, wav_file.readframes(wav_file.getnframes())
+
+def _read_cached_pcm(file_path: str) -> tuple[PcmFormat, bytes]:
+    """Read a cached PCM chunk; its format is encoded in the name as <key>.<channels>-<width>-<rate>.pcm"""
+    channels, sampwidth, rate = (int(v) for v in os.path.basename(file_path).split('.')[1].split('-'))
+    with open(file_path, 'rb') as f:
+        return (channels, sampwidth, rate), f.read()
+
+def _pcm_suffix(pcm_format: PcmFormat) -> str:
+    """File suffix recording a cached PCM chunk's format"""
+    return ".{}-{}-{}.pcm".format(*pcm_format)
+
+def _wav_header(pcm_format: PcmFormat, data_size: int) -> bytes:
+    """Build a 44-byte PCM WAV header"""
+    channels, sampwidth, rate = pcm_format
+    block_align = channels * sampwidth
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, rate, rate * block_align, block_align, sampwidth * 8,
+        b"data", data_size
+    )
+
+def _write_wav(output_file: str, pcm_format: PcmFormat, segments: list[bytes], silence_seconds: float = 0.0):
+    """Write PCM segments as a single WAV file, with optional silence between them"""
+    channels, sampwidth, rate = pcm_format
+    # 8-bit WAV is unsigned, so its silence is 0x80 rather than 0x00
+    silent_byte = b"\x80" if sampwidth == 1 else b"\x00"
+    silence = silent_byte * (int(rate * silence_seconds) * sampwidth * channels)
+    data = silence.join(segments)
+    _write_file(output_file, _wav_header(pcm_format, len(data)), data)
+
+def _fix_wav_sizes(data: bytes) -> bytes:
+    """Fill in the RIFF/data sizes of a WAV streamed to a pipe (the writer couldn't seek back)"""
+    if len(data) < 44 or data[:4] != b"RIFF" or data[36:40] != b"data":
+        return data
+    fixed = bytearray(data)
+    struct.pack_into("<I", fixed, 4, len(data) - 8)
+    struct.pack_into("<I", fixed, 40, len(data) - 44)
+    return fixed
+
+def _write_file(output_file: str, *parts: bytes):
+    """Write data to output_file through one large buffer"""
+    with open(output_file, 'wb', buffering=1 << 20) as f:
+        for part in parts:
+            f.write(part)
+
+def _wav_duration(file_path: str) -> float | None:
+    """Read a WAV file's duration in seconds from its header, or None if not a WAV"""
+    try:
+        with wave.open(file_path, 'rb') as wav_file:
+            return wav_file.getnframes() / wav_file.getframerate()
+    except (wave.Error, EOFError, OSError, ZeroDivisionError):
+        return None
+
+class SynthesisCache:
+    """On-disk LRU cache of synthesized audio, keyed by the synthesis parameters"""
+    
+    def __init__(self, cache_dir: str | None = None, max_entries: int = 500):
+        self.cache_dir = cache_dir or user_cache_dir("offline")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        
+        # Pick up entries left by previous runs, least recently written first (syntheses
+        # still being written end in .part)
+        existing = [
+            os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+            if not name.endswith(".part")
+        ]
+        for path in sorted(existing, key=os.path.getmtime):
+            self._entries[os.path.basename(path).split('.', 1)[0]] = path
+        self._evict()
+    
+    @staticmethod
+    def make_key(engine: str, text: str, voice: str | None, speed, language: str | None) -> str:
+        """Build a deterministic cache key from the synthesis parameters"""
+        raw = f"{engine}|{voice}|{speed}|{language}|{text}".encode()
+        return hashlib.blake2b(raw, digest_size=16).hexdigest()
+    
+    def path_for(self, key: str, suffix: str) -> str:
+        """On-disk location of the entry for key with the given file suffix"""
+        return os.path.join(self.cache_dir, key + suffix)
+    
+    def get(self, key: str) -> str | None:
+        """Return the cached file for key, or None on a miss"""
+        path = self._entries.get(key)
+        if path is None:
+            return None
+        if not os.path.exists(path):
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return path
+    
+    def put(self, key: str, source_file: str):
+        """Store a copy of a freshly synthesized file (kept as is if it is the entry)"""
+        path = self.path_for(key, os.path.splitext(source_file)[1])
+        self._discard(key, keep=source_file)
+        if source_file != path:
+            if os.path.exists(path):
+                os.remove(path)
+            copy_file(source_file, path)
+        self._add(key, path)
+    
+    def put_bytes(self, key: str, data: bytes, suffix: str):
+        """Store data under key in a file ending with suffix"""
+        path = self.path_for(key, suffix)
+        self._discard(key)
+        _write_file(path, data)
+        self._add(key, path)
+    
+    def _add(self, key: str, path: str):
+        """Record a new most recently used entry"""
+        self._entries[key] = path
+        self._entries.move_to_end(key)
+        self._evict()
+    
+    def _discard(self, key: str, keep: str | None = None):
+        """Drop an existing entry for key along with its file (unless that file is keep)"""
+        path = self._entries.pop(key, None)
+        if path is not None and path != keep:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def _evict(self):
+        """Drop least recently used entries beyond max_entries"""
+        while len(self._entries) > self.max_entries:
+            _, path = self._entries.popitem(last=False)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+class _EspeakLib:
+    """In-process eSpeak NG synthesis through libespeak-ng (avoids a fork per call)"""
+    
+    # Constants from speak_lib.h
+    AUDIO_OUTPUT_SYNCHRONOUS = 2
+    POS_CHARACTER = 1
+    CHARS_UTF8 = 1
+    RATE = 1
+    EE_OK = 0
+    
+    _CALLBACK = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(ctypes.c_short), ctypes.c_int, ctypes.c_void_p)
+    
+    def __init__(self, lib: ctypes.CDLL, sample_rate: int):
+        self._lib = lib
+        self.sample_rate = sample_rate
+        self._pcm = bytearray()
+        # The library has global state, so synthesis calls are serialized
+        self._lock = threading.Lock()
+        # Keep a reference so the callback is not garbage collected
+        self._callback = self._CALLBACK(self._on_audio)
+        lib.espeak_SetSynthCallback(self._callback)
+        lib.espeak_SetVoiceByName.argtypes = [ctypes.c_char_p]
+        lib.espeak_Synth.argtypes = [
+            ctypes.c_void_p, ctypes.c_size_t, ctypes.c_uint, ctypes.c_int,
+            ctypes.c_uint, ctypes.c_uint, ctypes.c_void_p, ctypes.c_void_p
+        ]
+    
+    @classmethod
+    def load(cls) -> _EspeakLib | None:
+        """Load and initialize libespeak-ng (or libespeak), or None if unavailable"""
+        candidates = (
+            ctypes.util.find_library('espeak-ng'), 'libespeak-ng.so.1',
+            ctypes.util.find_library('espeak'), 'libespeak.so.1',
+        )
+        for path in filter(None, candidates):
+            try:
+                lib = ctypes.CDLL(path)
+                sample_rate = lib.espeak_Initialize(cls.AUDIO_OUTPUT_SYNCHRONOUS, 0, None, 0)
+            except (OSError, AttributeError) as e:
+                logger.debug(f"Could not load {path}: {e}")
+                continue
+            if sample_rate > 0:
+                return cls(lib, sample_rate)
+        return None
+    
+    def _on_audio(self, wav, numsamples, events) -> int:
+        if wav and numsamples > 0:
+            self._pcm += ctypes.string_at(wav, numsamples * 2)
+        return 0
+    
+    def synthesize(self, text: str, output_file: str, voice: str | None, speed: int) -> bool:
+        """Render text to a 16-bit mono WAV file (blocking)"""
+        data = text.encode('utf-8') + b'\0'
+        with self._lock:
+            self._pcm = bytearray()
+            self._lib.espeak_SetParameter(self.RATE, int(speed), 0)
+            # The voice is global library state, so reset it when none is requested
+            if self._lib.espeak_SetVoiceByName((voice or "default").encode('utf-8')) != self.EE_OK:
+                return False
+            if self._lib.espeak_Synth(data, len(data), 0, self.POS_CHARACTER, 0,
+                                      self.CHARS_UTF8, None, None) != self.EE_OK:
+                return False
+            self._lib.espeak_Synchronize()
+            pcm = bytes(self._pcm)
+        
+        # No samples means the callback never ran (e.g. another user of the library replaced it)
+        if not pcm:
+            return False
+        
+        with wave.open(output_file, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(self.sample_rate)
+            wav_file.writeframes(pcm)
+        return True
+
 class OfflineTextToSpeechServer:
     """MCP server for completely local/offline text-to-speech using multiple engines"""
     
     def __init__(self):
         self.app = Server("mcp-text-to-speech")
         self.available_engines = {}
+        # Language code -> pyttsx3 voice, resolved once at init
+        self._pyttsx3_voice_index = {}
+        # Voice the pyttsx3 driver started with; the driver keeps the last voice set,
+        # so requests that don't pick one restore it
+        self._pyttsx3_default_voice = None
+        self.synthesis_cache = SynthesisCache()
+        # Headerless PCM of individual sentence chunks, joined without re-parsing WAV headers
+        self.chunk_cache = SynthesisCache(user_cache_dir("offline_chunks"), max_entries=2000)
+        # Loaded Coqui models, most recently used last
+        self._coqui_models: OrderedDict[str, object] = OrderedDict()
+        self._coqui_lock = threading.Lock()
+        self._pygame = None
+        self._espeak_lib: _EspeakLib | None = None
+        # Per-engine job queues and their worker tasks, started on first use
+        self._queues: dict = {}
+        self._workers: dict = {}
+        self._engine_threads = {
+            name: ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"tts-{name}")
+            for name in THREAD_AFFINE_ENGINES
+        }
+        self._best_engine: str | None = None
+        self._recommendation = "No engines available"
+        # Engine detection runs in the background once an event loop is running
+        self._engine_ready: dict[str, asyncio.Event] = {}
+        self._probe_task: asyncio.Task | None = None
         self._setup_handlers()
-        self._initialize_tts_engines()
     
-    def _initialize_tts_engines(self):
-        """Initialize available TTS engines"""
+    def _update_engine_choice(self):
+        """Precompute the auto-selected engine and the recommendation from available_engines"""
+        self._best_engine = next(
+            (name for name in ENGINE_SELECTION_ORDER if name in self.available_engines), None
+        )
+        self._recommendation = next(
+            (text for name, text in ENGINE_RECOMMENDATIONS.items() if name in self.available_engines),
+            "No engines available"
+        )
+    
+    def _start_engine_probes(self):
+        """Start detecting engines in the background (each probe in its own worker thread)"""
+        if self._probe_task is not None:
+            return
         logger.info("🔍 Detecting available TTS engines...")
+        probes = {
+            'pyttsx3': self._probe_pyttsx3,
+            'gtts': self._probe_gtts,
+            'espeak': self._probe_espeak,
+            'coqui': self._probe_coqui,
+        }
+        self._engine_ready = {name: asyncio.Event() for name in probes}
+        self._probe_task = asyncio.create_task(self._probe_engines(probes))
+    
+    async def _probe_engines(self, probes: dict):
+        """Run all engine probes concurrently and log the outcome"""
+        await asyncio.gather(*(self._run_engine_probe(name, probe) for name, probe in probes.items()))
+        
+        # Keep the listing in a stable order regardless of which probe finished first
+        self.available_engines = {
+            name: self.available_engines[name] for name in probes if name in self.available_engines
+        }
         
-        # Test pyttsx3 (cross-platform offline)
+        if not self.available_engines:
+            logger.error("❌ No TTS engines available")
+        else:
+            logger.info(f"🎉 {len(self.available_engines)} TTS engines initialized")
+    
+    async def _run_engine_probe(self, name: str, probe):
+        """Probe one engine, record it if available and mark it ready"""
+        try:
+            info = await self._run_engine_call(name, probe)
+            if info is not None:
+                self.available_engines[name] = info
+                self._update_engine_choice()
+        finally:
+            self._engine_ready[name].set()
+    
+    async def _wait_for_engines(self, *names: str):
+        """Wait until the named engines (all engines if none are named) have been probed"""
+        self._start_engine_probes()
+        events = [self._engine_ready[name] for name in (names or self._engine_ready) if name in self._engine_ready]
+        try:
+            await asyncio.wait_for(asyncio.gather(*(event.wait() for event in events)), ENGINE_PROBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"⏳ Engine detection still running after {ENGINE_PROBE_TIMEOUT:.0f}s; using engines found so far")
+    
+    def _probe_pyttsx3(self) -> dict | None:
+        """Test pyttsx3 (cross-platform offline)"""
         try:
             import pyttsx3
             engine = pyttsx3.init()
-            voices = engine.getProperty('voices')
-            self.available_engines['pyttsx3'] = {
+            # Snapshot the voices once; querying them goes through the platform speech API
+            voices_list = self._snapshot_pyttsx3_voices(engine.getProperty('voices') or [])
+            self._pyttsx3_voice_index = self._build_pyttsx3_voice_index(voices_list)
+            self._pyttsx3_default_voice = engine.getProperty('voice')
+            logger.info("✅ pyttsx3 engine available")
+            return {
                 'engine': engine,
-                'voices': len(voices) if voices else 0,
+                'voices': len(voices_list),
+                'voices_list': voices_list,
                 'offline': True,
                 'quality': 'Good',
                 'description': 'Cross-platform offline TTS'
             }
-            logger.info("✅ pyttsx3 engine available")
         except Exception as e:
             logger.warning(f"❌ pyttsx3 not available: {e}")
-        
-        # Test gTTS (Google - requires internet)
+            return None
+    
+    def _probe_gtts(self) -> dict | None:
+        """Test gTTS (Google - requires internet)"""
         try:
             from gtts import gTTS
-            self.available_engines['gtts'] = {
+            logger.info("✅ gTTS engine available")
+            return {
                 'module': gTTS,
                 'offline': False,
                 'quality': 'Excellent',
                 'description': 'Google Text-to-Speech (requires internet)'
             }
-            logger.info("✅ gTTS engine available")
         except Exception as e:
             logger.warning(f"❌ gTTS not available: {e}")
-        
-        # Test espeak (Linux offline)
+            return None
+    
+    @staticmethod
+    def _pyttsx3_uses_libespeak() -> bool:
+        """Whether pyttsx3 is installed with its espeak driver (its default off macOS and Windows)"""
+        if sys.platform == 'darwin' or sys.platform.startswith('win'):
+            return False
+        return module_available('pyttsx3')
+    
+    def _probe_espeak(self) -> dict | None:
+        """Test espeak (Linux offline); listing voices doubles as the presence check"""
         try:
-            import subprocess
-            result = subprocess.run(['espeak', '--version'], capture_output=True, text=True)
-            if result.returncode == 0:
-                self.available_engines['espeak'] = {
-                    'offline': True,
-                    'quality': 'Basic',
-                    'description': 'eSpeak offline TTS (Linux)'
-                }
-                logger.info("✅ eSpeak engine available")
+            result = subprocess.run(['espeak', '--voices'], capture_output=True, text=True)
+            if result.returncode != 0:
+                return None
+            voices_list = self._parse_espeak_voices(result.stdout)
+            logger.info("✅ eSpeak engine available")
+            # pyttsx3's espeak driver initializes the same library and installs its own
+            # synth callback, so sharing it in-process would break one or the other
+            if self._pyttsx3_uses_libespeak():
+                logger.info("ℹ️  pyttsx3 uses libespeak; eSpeak synthesis runs the espeak command")
+            else:
+                self._espeak_lib = _EspeakLib.load()
+                if self._espeak_lib:
+                    logger.info("✅ Using libespeak in-process for eSpeak synthesis")
+            return {
+                'voices': len(voices_list),
+                'voices_list': voices_list,
+                'offline': True,
+                'quality': 'Basic',
+                'description': 'eSpeak offline TTS (Linux)'
+            }
         except Exception:
             logger.info("ℹ️  eSpeak not available (install with: apt-get install espeak)")
-        
-        # Test Coqui TTS (AI-based offline)
+            return None
+    
+    def _probe_coqui(self) -> dict | None:
+        """Test Coqui TTS (AI-based offline)"""
         try:
             from TTS.api import TTS
-            self.available_engines['coqui'] = {
+            logger.info("✅ Coqui TTS engine available")
+            return {
                 'module': TTS,
                 'offline': True,
                 'quality': 'Excellent',
                 'description': 'Coqui TTS - AI-based offline synthesis'
             }
-            logger.info("✅ Coqui TTS engine available")
         except Exception as e:
             logger.info(f"ℹ️  Coqui TTS not available: {e}")
+            return None
+    
+    @staticmethod
+    def _snapshot_pyttsx3_voices(voices) -> list:
+        """Copy pyttsx3 voice objects into plain dicts"""
+        snapshot = []
+        for v in voices:
+            languages = getattr(v, 'languages', None) or ['unknown']
+            snapshot.append({
+                "id": v.id,
+                "name": v.name,
+                # The espeak driver reports languages as bytes prefixed with a priority byte
+                "languages": [
+                    "".join(ch for ch in lang.decode(errors="ignore") if ch.isprintable())
+                    if isinstance(lang, bytes) else lang
+                    for lang in languages
+                ]
+            })
+        return snapshot
+    
+    @staticmethod
+    def _build_pyttsx3_voice_index(voices: list) -> dict:
+        """Map each Chinese language code to its preferred voice, falling back to any Chinese voice"""
+        fallback = None
+        for v in voices:
+            if ('chinese' in v["name"].lower() or 
+                'zh_' in v["id"].lower() or
+                any(name in v["name"].lower() for name in ['tingting', 'sinji', 'meijia'])):
+                fallback = v
+                break
         
-        if not self.available_engines:
-            logger.error("❌ No TTS engines available")
-        else:
-            logger.info(f"🎉 {len(self.available_engines)} TTS engines initialized")
+        index = {}
+        for lang, preferred_voices in CHINESE_VOICE_PREFERENCES.items():
+            selected_voice = None
+            for pref_voice in preferred_voices:
+                for v in voices:
+                    if pref_voice in v["name"].lower() or pref_voice in v["id"].lower():
+                        selected_voice = v
+                        break
+                if selected_voice:
+                    break
+            selected_voice = selected_voice or fallback
+            if selected_voice:
+                index[lang] = selected_voice
+                logger.debug(f"Selected {lang} voice: {selected_voice['name']} ({selected_voice['id']})")
+        return index
+    
+    @staticmethod
+    def _parse_espeak_voices(output: str) -> list:
+        """Parse the `espeak --voices` table"""
+        voices = []
+        for line in output.strip().split('\n')[1:]:  # Skip header
+            parts = line.split()
+            if len(parts) >= 5:
+                voices.append({
+                    "id": parts[4],
+                    "name": parts[3],
+                    "languages": [parts[1]]
+                })
+        return voices
     
     def _setup_handlers(self):
         """Setup MCP message handlers"""
@@ -154,6 +617,11 @@ class OfflineTextToSpeechServer:
                                 "type": "string",
                                 "default": "en",
                                 "description": "Language code (e.g., 'en', 'es', 'fr')"
+                            },
+                            "disable_cache": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Always run the engine instead of reusing cached audio"
                             }
                         },
                         "required": ["text"]
@@ -208,6 +676,11 @@ class OfflineTextToSpeechServer:
                             "output_dir": {
                                 "type": "string",
                                 "description": "Output directory for audio files"
+                            },
+                            "disable_cache": {
+                                "type": "boolean",
+                                "default": False,
+                                "description": "Always run the engine instead of reusing cached audio"
                             }
                         },
                         "required": ["texts"]
@@ -240,6 +713,8 @@ class OfflineTextToSpeechServer:
     
     async def _get_available_engines(self) -> list[TextContent]:
         """Get available TTS engines and their capabilities"""
+        await self._wait_for_engines()
+        
         engines_info = {
             "available_engines": [],
             "total_engines": len(self.available_engines),
@@ -262,60 +737,84 @@ class OfflineTextToSpeechServer:
             else:
                 engines_info["online_engines"] += 1
         
-        engines_info["recommendation"] = self._get_engine_recommendation()
+        engines_info["recommendation"] = self._recommendation
         
-        return [TextContent(type="text", text=json.dumps(engines_info, indent=2))]
-    
-    def _get_engine_recommendation(self) -> str:
-        """Get recommended engine based on available options"""
-        if 'pyttsx3' in self.available_engines:
-            return "pyttsx3 (best offline option)"
-        elif 'espeak' in self.available_engines:
-            return "espeak (Linux offline)"
-        elif 'coqui' in self.available_engines:
-            return "coqui (AI-based offline)"
-        elif 'gtts' in self.available_engines:
-            return "gtts (requires internet, excellent quality)"
-        else:
-            return "No engines available"
+        return [TextContent(type="text", text=_dumps(engines_info))]
     
     async def _synthesize_speech(self, arguments: dict) -> list[TextContent]:
         """Synthesize speech from text"""
+        return [TextContent(type="text", text=_dumps(await self._synthesize_to_dict(arguments)))]
+    
+    async def _synthesize_to_dict(self, arguments: dict) -> dict:
+        """Synthesize speech from text and return the result payload"""
         text = arguments.get("text", "")
         engine = arguments.get("engine", "auto")
         voice = arguments.get("voice")
         speed = arguments.get("speed", 150)
         output_file = arguments.get("output_file")
         language = arguments.get("language", "en")
+        use_cache = not arguments.get("disable_cache", False)
         
         if not text:
             raise ValueError("Text is required for synthesis")
         
-        # Auto-select engine if not specified
+        # Auto-select engine if not specified (needs every probe to have finished)
         if engine == "auto":
+            await self._wait_for_engines()
             engine = self._select_best_engine()
+        else:
+            await self._wait_for_engines(engine)
         
         if engine not in self.available_engines:
             raise ValueError(f"Engine '{engine}' not available. Available: {list(self.available_engines.keys())}")
         
-        # Generate output file if not provided
+        cache_key = self.synthesis_cache.make_key(engine, text, voice, speed, language)
+        
+        # Default output is the cache entry itself (pruned along with the cache), or a file
+        # named after the request under $TTS_OUTPUT_DIR
+        entry_file = self.synthesis_cache.path_for(cache_key, ".wav")
         if not output_file:
-            output_file = os.path.join(tempfile.gettempdir(), f"tts_{uuid.uuid4().hex[:8]}.wav")
+            output_dir = user_output_dir()
+            output_file = os.path.join(output_dir, f"tts_{cache_key[:16]}.wav") if output_dir else entry_file
+        
+        # Fresh audio still replaces the cached copy (the default output is that copy)
+        cached_file = self.synthesis_cache.get(cache_key) if use_cache else None
         
         try:
-            if engine == "pyttsx3":
-                success = await self._synthesize_pyttsx3(text, output_file, voice, speed, language)
-            elif engine == "gtts":
-                success = await self._synthesize_gtts(text, output_file, language)
-            elif engine == "espeak":
-                success = await self._synthesize_espeak(text, output_file, voice, speed)
-            elif engine == "coqui":
-                success = await self._synthesize_coqui(text, output_file, voice)
+            if cached_file:
+                # Identical request already synthesized: serve it from the cache
+                if cached_file != output_file:
+                    copy_file(cached_file, output_file)
+                success, file_size = True, os.stat(cached_file).st_size
             else:
-                raise ValueError(f"Synthesis method not implemented for engine: {engine}")
+                # A cache entry must only ever appear complete, so synthesize it under a temporary name
+                synth_file = f"{entry_file}.{uuid.uuid4().hex[:8]}.part" if output_file == entry_file else output_file
+                try:
+                    chunks = chunk_text(text, CHUNK_MAX_CHARS) if engine in CHUNKABLE_ENGINES and len(text) > CHUNK_MAX_CHARS else []
+                    if len(chunks) > 1:
+                        success, file_size = await self._synthesize_chunked(
+                            engine, chunks, synth_file, voice, speed, language
+                        )
+                    else:
+                        success, file_size = await self._submit_to_engine(
+                            engine, text, synth_file, voice, speed, language
+                        )
+                    if success and synth_file != output_file:
+                        os.replace(synth_file, output_file)
+                finally:
+                    if synth_file != output_file:
+                        try:
+                            os.remove(synth_file)
+                        except OSError:
+                            pass
+                
+                if success:
+                    try:
+                        self.synthesis_cache.put(cache_key, output_file)
+                    except OSError as e:
+                        logger.warning(f"Could not cache synthesis result: {e}")
             
             if success:
-                file_size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
                 result = {
                     "status": "success",
                     "text": text,
@@ -324,186 +823,265 @@ class OfflineTextToSpeechServer:
                     "file_size_bytes": file_size,
                     "language": language,
                     "voice": voice,
-                    "speed": speed
+                    "speed": speed,
+                    "cached": cached_file is not None
                 }
                 
                 logger.info(f"Speech synthesis successful: {output_file} ({file_size} bytes)")
-                return [TextContent(type="text", text=json.dumps(result, indent=2))]
+                return result
             else:
                 raise Exception("Synthesis failed")
                 
         except Exception as e:
             logger.error(f"Synthesis error with {engine}: {e}")
-            return [TextContent(
-                type="text",
-                text=json.dumps({
-                    "status": "error",
-                    "message": str(e),
-                    "engine": engine,
-                    "text": text
-                })
-            )]
-    
-    def _select_best_engine(self) -> str:
-        """Select the best available engine"""
-        if 'pyttsx3' in self.available_engines:
-            return 'pyttsx3'
-        elif 'coqui' in self.available_engines:
-            return 'coqui'
-        elif 'espeak' in self.available_engines:
-            return 'espeak'
-        elif 'gtts' in self.available_engines:
-            return 'gtts'
-        else:
-            raise ValueError("No TTS engines available")
+            return {
+                "status": "error",
+                "message": str(e),
+                "engine": engine,
+                "text": text
+            }
     
-    async def _synthesize_pyttsx3(self, text: str, output_file: str, voice: Optional[str], speed: int, language: Optional[str] = None) -> bool:
-        """Synthesize using pyttsx3 engine with enhanced Chinese/Cantonese support"""
+    async def _synthesize_chunked(self, engine: str, chunks: list[str], output_file: str, voice: str | None, speed: int, language: str) -> tuple[bool, int]:
+        """Synthesize text chunks concurrently (reusing cached chunk PCM) and join them into one WAV"""
+        keys = [self.chunk_cache.make_key(engine, chunk, voice, speed, language) for chunk in chunks]
+        cached = [self.chunk_cache.get(key) for key in keys]
+        
+        run_id = uuid.uuid4().hex[:8]
+        chunk_files = {
+            i: os.path.join(tempfile.gettempdir(), f"tts_chunk_{run_id}_{i:03d}.wav")
+            for i, cached_file in enumerate(cached) if cached_file is None
+        }
         try:
-            engine = self.available_engines['pyttsx3']['engine']
-            
-            # Set properties
-            engine.setProperty('rate', speed)
+            outcomes = await asyncio.gather(*(
+                self._submit_to_engine(engine, chunks[i], chunk_file, voice, speed, language)
+                for i, chunk_file in chunk_files.items()
+            ))
+            if not all(success for success, _ in outcomes):
+                return False, 0
             
-            # Enhanced Chinese/Cantonese voice selection
-            if voice or language:
-                voices = engine.getProperty('voices')
-                selected_voice = None
-                
-                # Priority 1: If voice specified, use exact match
-                if voice:
-                    for v in voices:
-                        if voice.lower() in v.name.lower() or voice in v.id:
-                            selected_voice = v
-                            break
-                
-                # Priority 2: If language specified, find best Chinese voice
-                if not selected_voice and language:
-                    lang_lower = language.lower()
-                    
-                    # Define Chinese language preferences
-                    chinese_preferences = {
-                        'yue': ['sinji', 'zh_hk'],          # Cantonese preferences
-                        'zh-hk': ['sinji', 'zh_hk'],        # Hong Kong
-                        'cantonese': ['sinji', 'zh_hk'],    # Cantonese
-                        'zh-cn': ['tingting', 'zh_cn'],     # Mandarin (China)
-                        'zh-tw': ['meijia', 'zh_tw'],       # Mandarin (Taiwan)
-                        'zh': ['tingting', 'zh_cn'],        # Default Chinese
-                        'chinese': ['tingting', 'zh_cn']    # Generic Chinese
-                    }
-                    
-                    if lang_lower in chinese_preferences:
-                        preferred_voices = chinese_preferences[lang_lower]
-                        
-                        # Try to find preferred voices in order
-                        for pref_voice in preferred_voices:
-                            for v in voices:
-                                if (pref_voice.lower() in v.name.lower() or 
-                                    pref_voice.lower() in v.id.lower()):
-                                    selected_voice = v
-                                    logger.info(f"Selected {lang_lower} voice: {v.name} ({v.id})")
-                                    break
-                            if selected_voice:
-                                break
-                        
-                        # Fallback: any Chinese voice
-                        if not selected_voice:
-                            for v in voices:
-                                if ('chinese' in v.name.lower() or 
-                                    'zh_' in v.id.lower() or
-                                    any(name in v.name.lower() for name in ['tingting', 'sinji', 'meijia'])):
-                                    selected_voice = v
-                                    logger.info(f"Fallback Chinese voice: {v.name} ({v.id})")
-                                    break
-                
-                # Set the selected voice
-                if selected_voice:
-                    engine.setProperty('voice', selected_voice.id)
-                    logger.info(f"Using voice: {selected_voice.name} ({selected_voice.id})")
+            def load_chunks() -> list[tuple[PcmFormat, bytes]]:
+                return [
+                    _read_cached_pcm(cached_file) if cached_file else _read_wav_pcm(chunk_files[i])
+                    for i, cached_file in enumerate(cached)
+                ]
             
-            # Save to file
-            engine.save_to_file(text, output_file)
-            engine.runAndWait()
+            loaded = await asyncio.to_thread(load_chunks)
             
-            return os.path.exists(output_file)
+            pcm_format = loaded[0][0]
+            for i, (chunk_format, frames) in enumerate(loaded):
+                if chunk_format != pcm_format:
+                    raise ValueError("Cannot join chunks with different audio formats")
+                if i in chunk_files:
+                    self.chunk_cache.put_bytes(keys[i], frames, _pcm_suffix(chunk_format))
             
+            segments = [frames for _, frames in loaded]
+            await asyncio.to_thread(_write_wav, output_file, pcm_format, segments, CHUNK_SILENCE_SECONDS)
+            return _stat_output(output_file)
+        finally:
+            for chunk_file in chunk_files.values():
+                try:
+                    os.remove(chunk_file)
+                except OSError:
+                    pass
+    
+    async def _submit_to_engine(self, engine: str, *job) -> tuple[bool, int]:
+        """Queue a synthesis job on the engine's worker pool and wait for its result"""
+        queue = self._queues.get(engine)
+        if queue is None:
+            queue = self._queues[engine] = asyncio.Queue()
+            self._workers[engine] = [
+                asyncio.create_task(self._engine_worker(engine, queue))
+                for _ in range(ENGINE_WORKERS.get(engine, 1))
+            ]
+        
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((job, future))
+        return await future
+    
+    async def _engine_worker(self, engine: str, queue: asyncio.Queue):
+        """Pull synthesis jobs for one engine off its queue, one at a time"""
+        while True:
+            job, future = await queue.get()
+            try:
+                if future.done():
+                    continue
+                try:
+                    result = await self._synthesize_with_engine(engine, *job)
+                except Exception as e:
+                    # The caller may have been cancelled while the job ran
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                # Never let one job stop the worker; single-worker engines would hang
+                logger.error(f"{engine} worker error: {e}")
+            finally:
+                queue.task_done()
+    
+    async def _run_engine_call(self, engine: str, func, *args):
+        """Run a blocking engine call on the engine's own thread, or any worker thread if it has none"""
+        executor = self._engine_threads.get(engine)
+        if executor is None:
+            return await asyncio.to_thread(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args))
+    
+    async def _synthesize_with_engine(self, engine: str, text: str, output_file: str, voice: str | None, speed: int, language: str) -> tuple[bool, int]:
+        """Run a synthesis job on the named engine"""
+        if engine == "pyttsx3":
+            return await self._synthesize_pyttsx3(text, output_file, voice, speed, language)
+        elif engine == "gtts":
+            return await self._synthesize_gtts(text, output_file, language)
+        elif engine == "espeak":
+            return await self._synthesize_espeak(text, output_file, voice, speed)
+        elif engine == "coqui":
+            return await self._synthesize_coqui(text, output_file, voice)
+        else:
+            raise ValueError(f"Synthesis method not implemented for engine: {engine}")
+    
+    def _select_best_engine(self) -> str:
+        """Return the best available engine (chosen once after engine detection)"""
+        if self._best_engine is None:
+            raise ValueError("No TTS engines available")
+        return self._best_engine
+    
+    async def _synthesize_pyttsx3(self, text: str, output_file: str, voice: str | None, speed: int, language: str | None = None) -> tuple[bool, int]:
+        """Synthesize using pyttsx3 engine with enhanced Chinese/Cantonese support"""
+        try:
+            return await self._run_engine_call('pyttsx3', self._run_pyttsx3_sync, text, output_file, voice, speed, language)
         except Exception as e:
             logger.error(f"pyttsx3 synthesis error: {e}")
-            return False
+            return False, 0
     
-    async def _synthesize_gtts(self, text: str, output_file: str, language: str) -> bool:
+    def _run_pyttsx3_sync(self, text: str, output_file: str, voice: str | None, speed: int, language: str | None) -> tuple[bool, int]:
+        """Blocking part of pyttsx3 synthesis, run on the pyttsx3 thread"""
+        engine_info = self.available_engines['pyttsx3']
+        engine = engine_info['engine']
+        
+        # Set properties
+        engine.setProperty('rate', speed)
+        
+        # Enhanced Chinese/Cantonese voice selection
+        selected_voice = None
+        
+        # Priority 1: If voice specified, use exact match
+        if voice:
+            for v in engine_info['voices_list']:
+                if voice.lower() in v["name"].lower() or voice in v["id"]:
+                    selected_voice = v
+                    break
+        
+        # Priority 2: If language specified, use the best Chinese voice found at init
+        if not selected_voice and language:
+            selected_voice = self._pyttsx3_voice_index.get(language.lower())
+        
+        # Set the selected voice, or go back to the default one an earlier request may have changed
+        if selected_voice:
+            engine.setProperty('voice', selected_voice["id"])
+            logger.info(f"Using voice: {selected_voice['name']} ({selected_voice['id']})")
+        elif self._pyttsx3_default_voice:
+            engine.setProperty('voice', self._pyttsx3_default_voice)
+        
+        # Save to file
+        engine.save_to_file(text, output_file)
+        engine.runAndWait()
+        
+        return _stat_output(output_file)
+    
+    async def _synthesize_gtts(self, text: str, output_file: str, language: str) -> tuple[bool, int]:
         """Synthesize using gTTS engine with enhanced Chinese/Cantonese support"""
         try:
-            from gtts import gTTS
-            
-            # Map common Chinese variants to supported gTTS codes
-            language_map = {
-                'zh-hk': 'yue',        # Hong Kong -> Cantonese
-                'zh-yue': 'yue',       # Yue -> Cantonese  
-                'cantonese': 'yue',    # Cantonese -> yue
-                'zh-cn': 'zh-CN',      # Simplified Chinese
-                'zh-tw': 'zh-TW',      # Traditional Chinese
-                'zh': 'zh',            # Mandarin Chinese
-                'chinese': 'zh'        # Default Chinese -> Mandarin
-            }
+            gTTS = self.available_engines['gtts']['module']
             
             # Use mapped language or original if not found
-            gtts_lang = language_map.get(language.lower(), language)
+            gtts_lang = GTTS_LANGUAGE_MAP.get(language.lower(), language)
             
             logger.info(f"Using gTTS language: {gtts_lang} (from input: {language})")
             tts = gTTS(text=text, lang=gtts_lang, slow=False)
-            tts.save(output_file)
+            await asyncio.to_thread(tts.save, output_file)
             
-            return os.path.exists(output_file)
+            return _stat_output(output_file)
             
         except Exception as e:
             logger.error(f"gTTS synthesis error: {e}")
-            return False
+            return False, 0
     
-    async def _synthesize_espeak(self, text: str, output_file: str, voice: Optional[str], speed: int) -> bool:
+    async def _synthesize_espeak(self, text: str, output_file: str, voice: str | None, speed: int) -> tuple[bool, int]:
         """Synthesize using eSpeak engine"""
         try:
-            import subprocess
+            if self._espeak_lib is not None:
+                if await asyncio.to_thread(self._espeak_lib.synthesize, text, output_file, voice, speed):
+                    return _stat_output(output_file)
+                logger.info("libespeak synthesis failed, falling back to the espeak command")
             
-            cmd = ['espeak', '-s', str(speed), '-w', output_file]
+            # Collect the WAV from stdout and write it in one go rather than
+            # letting espeak issue many small writes to the file itself
+            cmd = ['espeak', '-s', str(speed), '--stdout']
             
             if voice:
                 cmd.extend(['-v', voice])
             
             cmd.append(text)
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            return result.returncode == 0 and os.path.exists(output_file)
+            proc = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            data, _ = await proc.communicate()
+            if proc.returncode != 0 or not data:
+                return False, 0
+            await asyncio.to_thread(_write_file, output_file, _fix_wav_sizes(data))
+            return True, len(data)
             
         except Exception as e:
             logger.error(f"eSpeak synthesis error: {e}")
-            return False
+            return False, 0
     
-    async def _synthesize_coqui(self, text: str, output_file: str, voice: Optional[str]) -> bool:
+    async def _synthesize_coqui(self, text: str, output_file: str, voice: str | None) -> tuple[bool, int]:
         """Synthesize using Coqui TTS engine"""
         try:
-            from TTS.api import TTS
+            TTS = self.available_engines['coqui']['module']
             
             # Use a default model if none specified
             model_name = voice or "tts_models/en/ljspeech/tacotron2-DDC"
             
-            tts = TTS(model_name=model_name)
-            tts.tts_to_file(text=text, file_path=output_file)
+            def run_coqui():
+                tts = self._get_coqui_model(TTS, model_name)
+                tts.tts_to_file(text=text, file_path=output_file)
             
-            return os.path.exists(output_file)
+            # Model loading and inference are CPU-bound; keep them off the event loop
+            await self._run_engine_call('coqui', run_coqui)
+            
+            return _stat_output(output_file)
             
         except Exception as e:
             logger.error(f"Coqui TTS synthesis error: {e}")
-            return False
+            return False, 0
+    
+    def _get_coqui_model(self, tts_class, model_name: str):
+        """Load a Coqui model once and reuse it (keeps at most MAX_COQUI_MODELS loaded)"""
+        with self._coqui_lock:
+            tts = self._coqui_models.get(model_name)
+            if tts is None:
+                tts = tts_class(model_name=model_name)
+                self._coqui_models[model_name] = tts
+                while len(self._coqui_models) > MAX_COQUI_MODELS:
+                    self._coqui_models.popitem(last=False)
+            else:
+                self._coqui_models.move_to_end(model_name)
+            return tts
     
     async def _list_voices(self, arguments: dict) -> list[TextContent]:
         """List available voices for specified engine"""
         engine = arguments.get("engine", "pyttsx3")
+        await self._wait_for_engines(engine)
         
         if engine not in self.available_engines:
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=_dumps({
                     "error": f"Engine '{engine}' not available",
                     "available_engines": list(self.available_engines.keys())
                 })
@@ -513,14 +1091,8 @@ class OfflineTextToSpeechServer:
         
         try:
             if engine == "pyttsx3":
-                engine_obj = self.available_engines['pyttsx3']['engine']
-                voices = engine_obj.getProperty('voices')
-                for voice in voices:
-                    voices_info["voices"].append({
-                        "id": voice.id,
-                        "name": voice.name,
-                        "languages": getattr(voice, 'languages', ['unknown'])
-                    })
+                # Voices were snapshotted at init
+                voices_info["voices"] = self.available_engines['pyttsx3']['voices_list']
             
             elif engine == "gtts":
                 # gTTS supports many languages including enhanced Chinese/Cantonese
@@ -539,26 +1111,15 @@ class OfflineTextToSpeechServer:
                 ]
             
             elif engine == "espeak":
-                # eSpeak has many voices
-                import subprocess
-                result = subprocess.run(['espeak', '--voices'], capture_output=True, text=True)
-                if result.returncode == 0:
-                    lines = result.stdout.strip().split('\n')[1:]  # Skip header
-                    for line in lines:
-                        parts = line.split()
-                        if len(parts) >= 4:
-                            voices_info["voices"].append({
-                                "id": parts[4],
-                                "name": parts[3],
-                                "languages": [parts[1]]
-                            })
+                # eSpeak has many voices, listed once at init
+                voices_info["voices"] = self.available_engines['espeak']['voices_list']
             
             voices_info["total_voices"] = len(voices_info["voices"])
             
         except Exception as e:
             voices_info["error"] = str(e)
         
-        return [TextContent(type="text", text=json.dumps(voices_info, indent=2))]
+        return [TextContent(type="text", text=_dumps(voices_info))]
     
     async def _play_audio(self, arguments: dict) -> list[TextContent]:
         """Play generated audio file"""
@@ -567,21 +1128,26 @@ class OfflineTextToSpeechServer:
         if not file_path or not os.path.exists(file_path):
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=_dumps({
                     "error": "File not found",
                     "file_path": file_path
                 })
             )]
         
         try:
-            import pygame
+            pygame = self._get_pygame()
             pygame.mixer.init()
             pygame.mixer.music.load(file_path)
             pygame.mixer.music.play()
             
-            # Wait for playback to finish
+            # Sleep through the known duration in one go, then only poll the short tail
+            # (mixer latency, or formats such as MP3 whose duration isn't in a header)
+            duration = _wav_duration(file_path)
+            if duration:
+                await asyncio.sleep(duration)
+            poll_interval = 0.1 if duration is None else 0.01
             while pygame.mixer.music.get_busy():
-                await asyncio.sleep(0.1)
+                await asyncio.sleep(poll_interval)
             
             result = {
                 "status": "success",
@@ -596,13 +1162,23 @@ class OfflineTextToSpeechServer:
                 "file_path": file_path
             }
         
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        return [TextContent(type="text", text=_dumps(result))]
+    
+    def _get_pygame(self):
+        """Import pygame on first playback and keep the module for later calls"""
+        if self._pygame is None:
+            # pygame prints a banner on import, which would corrupt the stdio MCP stream
+            os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+            import pygame
+            self._pygame = pygame
+        return self._pygame
     
     async def _batch_synthesize(self, arguments: dict) -> list[TextContent]:
         """Convert multiple texts to speech files"""
         texts = arguments.get("texts", [])
         engine = arguments.get("engine", "auto")
         output_dir = arguments.get("output_dir", tempfile.gettempdir())
+        disable_cache = arguments.get("disable_cache", False)
         
         if not texts:
             raise ValueError("At least one text is required")
@@ -610,19 +1186,35 @@ class OfflineTextToSpeechServer:
         # Create output directory if it doesn't exist
         os.makedirs(output_dir, exist_ok=True)
         
-        results = []
-        for i, text in enumerate(texts):
-            output_file = os.path.join(output_dir, f"batch_tts_{i+1:03d}_{uuid.uuid4().hex[:8]}.wav")
-            
-            # Use single synthesis for each text
-            synthesis_result = await self._synthesize_speech({
-                "text": text,
-                "engine": engine,
-                "output_file": output_file
-            })
-            
-            result_data = json.loads(synthesis_result[0].text)
-            results.append(result_data)
+        if engine == "auto":
+            await self._wait_for_engines()
+            resolved_engine = self._select_best_engine()
+        else:
+            await self._wait_for_engines(engine)
+            resolved_engine = engine
+        
+        prefix = os.path.join(output_dir, "batch_tts_")
+        output_files = [f"{prefix}{i+1:03d}_{secrets.token_hex(4)}.wav" for i in range(len(texts))]
+        
+        # Use single synthesis for each text; the engine's worker pool bounds concurrency
+        # (gather preserves input order in its results)
+        outcomes = await asyncio.gather(
+            *(
+                self._synthesize_to_dict({
+                    "text": text,
+                    "engine": resolved_engine,
+                    "output_file": output_file,
+                    "disable_cache": disable_cache
+                })
+                for text, output_file in zip(texts, output_files)
+            ),
+            return_exceptions=True
+        )
+        results = [
+            {"status": "error", "message": str(outcome), "text": text}
+            if isinstance(outcome, Exception) else outcome
+            for text, outcome in zip(texts, outcomes)
+        ]
         
         batch_result = {
             "status": "completed",
@@ -631,25 +1223,32 @@ class OfflineTextToSpeechServer:
             "results": results
         }
         
-        return [TextContent(type="text", text=json.dumps(batch_result, indent=2))]
+        return [TextContent(type="text", text=_dumps(batch_result))]
 
     async def run_server(self):
         """Run the MCP server"""
         from mcp.server.stdio import stdio_server
         
-        async with stdio_server() as (read_stream, write_stream):
-            await self.app.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="mcp-text-to-speech",
-                    server_version="1.0.0",
-                    capabilities=self.app.get_capabilities(
-                        notification_options=NotificationOptions(),
-                        experimental_capabilities={},
+        # Detect engines while the MCP handshake proceeds
+        self._start_engine_probes()
+        
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await self.app.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="mcp-text-to-speech",
+                        server_version="1.0.0",
+                        capabilities=self.app.get_capabilities(
+                            notification_options=NotificationOptions(),
+                            experimental_capabilities={},
+                        ),
                     ),
-                ),
-            )
+                )
+        finally:
+            for executor in self._engine_threads.values():
+                executor.shutdown(wait=False)
 
 # Entry point for running the server
 async def main():
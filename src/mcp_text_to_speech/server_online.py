@@ -5,11 +5,16 @@ Includes gTTS, Azure Cognitive Services, and other online providers
 """
 
 import asyncio
+import base64
+import hashlib
 import json
 import logging
 import os
+import re
+import shutil
 import tempfile
 import uuid
+from collections import OrderedDict
 from typing import Any, Optional, List
 
 # MCP imports
@@ -26,16 +31,296 @@ from mcp.types import (
     ErrorData,
 )
 
+from .utils import chunk_text, copy_file, module_available, user_cache_dir, user_output_dir
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _dumps(obj) -> str:
+    """Serialize a tool response as indented JSON (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2, ensure_ascii=False)
+
+# Base64 audio payload in a line of Google Translate's batchexecute response, copied from
+# gTTS's own parser (checked against gTTS 2.5.4)
+_GTTS_AUDIO_RE = re.compile(r'jQ1olc","\[\\"(.*)\\"]')
+
+# Per-request text limits (hard limits for Polly and Watson); MP3 output can be joined by
+# appending bytes, so longer texts are split at sentence ends and the parts synthesized concurrently
+CHUNK_LIMITS = {
+    'gtts': 5000,
+    'polly': 3000,
+    'watson': 5000,
+}
+
+# Per-request text limits of services whose output can't be joined that way
+# (Azure writes RIFF/WAV, one header per file); longer texts are rejected
+UNCHUNKED_LIMITS = {
+    'azure': 10000,
+}
+
+# Longest text accepted at all, so oversized input fails fast instead of fanning out into requests
+MAX_TEXT_CHARS = 100000
+
+# Concurrent requests allowed per service, sized to the documented rate limits
+# (see get_service_limits) so bursts queue locally instead of drawing 429s
+SERVICE_CONCURRENCY = {
+    'gtts': 5,
+    'azure': 20,
+    'polly': 100,
+    'watson': 10,
+}
+
+# gTTS splits text into ~100-character parts, one POST each; bound the POSTs in flight
+# to the unofficial endpoint across all gTTS syntheses
+GTTS_PART_CONCURRENCY = 10
+
+# Usage limits and pricing reported by get_service_limits
+SERVICE_LIMITS = {
+    "gtts": {
+        "free_tier": "Unlimited (rate limited)",
+        "character_limit": "100 characters per request",
+        "rate_limit": "Reasonable use policy",
+        "pricing": "Free",
+        "notes": "Google's free service with reasonable use limits"
+    },
+    "azure": {
+        "free_tier": "5 million characters per month",
+        "pricing_per_million": "$4.00 (Standard), $16.00 (Neural)",
+        "character_limit": "10,000 characters per request",
+        "rate_limit": "20 transactions per second",
+        "notes": "Requires Azure subscription after free tier"
+    },
+    "polly": {
+        "free_tier": "5 million characters per month (first 12 months)",
+        "pricing_per_million": "$4.00 (Standard), $16.00 (Neural)",
+        "character_limit": "3000 characters per request",
+        "rate_limit": "100 transactions per second",
+        "notes": "AWS account required"
+    },
+    "watson": {
+        "free_tier": "10,000 characters per month",
+        "pricing_per_thousand": "$0.02",
+        "character_limit": "5000 characters per request",
+        "rate_limit": "10 transactions per second",
+        "notes": "IBM Cloud account required"
+    }
+}
+
+# Services in order of preference, with the recommendation shown for each
+SERVICE_RECOMMENDATIONS = {
+    'gtts': "gtts (free, good quality)",
+    'azure': "azure (excellent quality, neural voices)",
+    'polly': "polly (excellent quality, many voices)",
+    'watson': "watson (excellent quality)",
+}
+
+# Default voices per language for each service
+AZURE_VOICE_MAP = {
+    'en': 'en-US-JennyNeural',
+    'es': 'es-ES-ElviraNeural',
+    'fr': 'fr-FR-DeniseNeural',
+    'de': 'de-DE-KatjaNeural',
+    'it': 'it-IT-ElsaNeural'
+}
+POLLY_VOICE_MAP = {
+    'en': 'Joanna',
+    'es': 'Conchita',
+    'fr': 'Celine',
+    'de': 'Marlene',
+    'it': 'Carla'
+}
+WATSON_VOICE_MAP = {
+    'en': 'en-US_AllisonV3Voice',
+    'es': 'es-ES_EnriqueV3Voice',
+    'fr': 'fr-FR_ReneeV3Voice',
+    'de': 'de-DE_BirgitV3Voice',
+    'it': 'it-IT_FrancescaV3Voice'
+}
+
+# Speed option -> Polly SSML prosody rate
+POLLY_SPEED_MAP = {
+    'x-slow': '50%',
+    'slow': '75%',
+    'medium': '100%',
+    'fast': '125%',
+    'x-fast': '150%'
+}
+
+# Accepted speed/pitch options (tool schema enums and argument validation)
+SPEED_OPTIONS = ("x-slow", "slow", "medium", "fast", "x-fast")
+PITCH_OPTIONS = ("x-low", "low", "medium", "high", "x-high")
+_SPEEDS = frozenset(SPEED_OPTIONS)
+_PITCHES = frozenset(PITCH_OPTIONS)
+
+# SSML documents; every substituted value is passed through _escape_ssml
+AZURE_SSML_TEMPLATE = (
+    '<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="{lang}">'
+    '<voice name="{voice}"><prosody rate="{speed}" pitch="{pitch}">{text}</prosody></voice></speak>'
+)
+POLLY_SSML_TEMPLATE = '<speak><prosody rate="{speed}">{text}</prosody></speak>'
+
+_SSML_ESCAPE = {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}
+_SSML_TRANS = str.maketrans(_SSML_ESCAPE)
+_WS_RE = re.compile(r'\s+')
+
+def _escape_ssml(value: str) -> str:
+    """Escape a value for SSML element text or a double-quoted attribute"""
+    return value.translate(_SSML_TRANS)
+
+def _file_size(path: str) -> Optional[int]:
+    """Size of path in bytes from a single stat, or None if it doesn't exist"""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+class AudioCache:
+    """Two-level cache of synthesized audio: an in-memory LRU of bytes over an on-disk
+    directory that survives restarts and is pruned by mtime when it outgrows its cap"""
+    
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 1000,
+                 max_bytes: int = 64 * 1024 * 1024, max_disk_bytes: Optional[int] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        
+        self.cache_dir = cache_dir or user_cache_dir("online")
+        if max_disk_bytes is None:
+            max_disk_bytes = int(os.getenv('TTS_CACHE_MAX_MB', '512')) * 1024 * 1024
+        self.max_disk_bytes = max_disk_bytes
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        self.disk_bytes = sum(entry.stat().st_size for entry in self._scan_disk())
+    
+    @staticmethod
+    def make_key(text: str, service: str, voice: Optional[str], language: str, speed: str, pitch: str) -> str:
+        """Build a deterministic cache key from the normalized synthesis parameters"""
+        norm = {
+            # Whitespace runs don't change the audio; case does ("US" vs "us"), so keep it
+            "text": " ".join(text.split()),
+            "service": service,
+            "voice": voice,
+            "language": language,
+            "speed": speed,
+            "pitch": pitch
+        }
+        return hashlib.blake2b(json.dumps(norm, sort_keys=True).encode(), digest_size=16).hexdigest()
+    
+    def path_for(self, key: str) -> str:
+        """On-disk location of the entry for key"""
+        return os.path.join(self.cache_dir, key + ".mp3")
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached audio for key from memory or disk, or None on a miss"""
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+            return audio
+        try:
+            with open(self.path_for(key), 'rb') as f:
+                audio = f.read()
+        except FileNotFoundError:
+            return None
+        self._remember(key, audio)
+        return audio
+    
+    def restore(self, key: str, audio: bytes, output_file: str):
+        """Place cached audio at output_file (a copy of the disk entry, unless it is the entry)"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # Mark as recently used for the pruner
+            if output_file != path:
+                copy_file(path, output_file)
+        except OSError:
+            # The disk entry was pruned; write the in-memory copy instead
+            with open(output_file, 'wb') as f:
+                f.write(audio)
+    
+    def put(self, key: str, output_file: str):
+        """Store a freshly synthesized file in memory and a copy of it on disk"""
+        with open(output_file, 'rb') as f:
+            audio = f.read()
+        self._remember(key, audio)
+        
+        path = self.path_for(key)
+        if output_file != path:
+            if os.path.exists(path):
+                self.disk_bytes -= os.path.getsize(path)
+                os.remove(path)
+            copy_file(output_file, path)
+        # An output written straight to its entry may have replaced an older one; the
+        # total is then over-counted until the next prune recounts it
+        self.disk_bytes += len(audio)
+        if self.disk_bytes > self.max_disk_bytes:
+            self._prune_disk()
+    
+    def _remember(self, key: str, audio: bytes):
+        """Keep audio in the in-memory LRU"""
+        if len(audio) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.total_bytes -= len(previous)
+        self._entries[key] = audio
+        self.total_bytes += len(audio)
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+    
+    def _scan_disk(self) -> list:
+        """Directory entries of the cached files (syntheses still being written end in .part)"""
+        return [entry for entry in os.scandir(self.cache_dir) if entry.is_file() and not entry.name.endswith(".part")]
+    
+    def _prune_disk(self):
+        """Delete least recently used files until the directory is back under 90% of its cap"""
+        entries = sorted(
+            ((entry.stat(), entry.path) for entry in self._scan_disk()),
+            key=lambda item: item[0].st_mtime
+        )
+        self.disk_bytes = sum(st.st_size for st, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        for st, path in entries:
+            if self.disk_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.disk_bytes -= st.st_size
+        logger.info("🧹 Pruned online audio cache to %d KB", self.disk_bytes // 1024)
+
 class OnlineTextToSpeechServer:
     """MCP server for online/cloud-based text-to-speech services"""
     
     def __init__(self):
         self.app = Server("mcp-text-to-speech-online")
         self.available_services = {}
+        self.audio_cache = AudioCache()
+        # Pooled keep-alive HTTP client shared by all gTTS requests (closed when the server stops)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=30
+        ) if httpx is not None else None
+        # Cache key -> task of the synthesis in progress, resolving to (output file, size or
+        # None if it failed), so identical concurrent requests share one service call
+        self._inflight: dict = {}
+        self._service_slots = {
+            service: asyncio.Semaphore(limit) for service, limit in SERVICE_CONCURRENCY.items()
+        }
+        self._gtts_part_slots = asyncio.Semaphore(GTTS_PART_CONCURRENCY)
         self._setup_handlers()
         self._initialize_online_services()
     
@@ -55,14 +340,16 @@ class OnlineTextToSpeechServer:
             }
             logger.info("✅ Google TTS (gTTS) available")
         except Exception as e:
-            logger.warning(f"❌ Google TTS not available: {e}")
+            logger.warning("❌ Google TTS not available: %s", e)
+        
+        # The cloud SDKs are large; only check they're installed here and import
+        # each one the first time its service is used
         
         # Test Azure Cognitive Services
-        try:
-            import azure.cognitiveservices.speech as speechsdk
+        if module_available('azure.cognitiveservices.speech'):
             if os.getenv('AZURE_SPEECH_KEY') and os.getenv('AZURE_SPEECH_REGION'):
                 self.available_services['azure'] = {
-                    'module': speechsdk,
+                    'module': None,
                     'quality': 'Excellent',
                     'description': 'Azure Cognitive Services Speech',
                     'neural_voices': True,
@@ -71,15 +358,14 @@ class OnlineTextToSpeechServer:
                 logger.info("✅ Azure Speech Services available")
             else:
                 logger.info("ℹ️  Azure Speech Services: Set AZURE_SPEECH_KEY and AZURE_SPEECH_REGION environment variables")
-        except Exception:
+        else:
             logger.info("ℹ️  Azure Speech Services not available (install with: pip install azure-cognitiveservices-speech)")
         
         # Test Amazon Polly
-        try:
-            import boto3
+        if module_available('boto3'):
             if os.getenv('AWS_ACCESS_KEY_ID') and os.getenv('AWS_SECRET_ACCESS_KEY'):
                 self.available_services['polly'] = {
-                    'client': boto3.client('polly'),
+                    'client': None,
                     'quality': 'Excellent',
                     'description': 'Amazon Polly',
                     'neural_voices': True,
@@ -88,21 +374,14 @@ class OnlineTextToSpeechServer:
                 logger.info("✅ Amazon Polly available")
             else:
                 logger.info("ℹ️  Amazon Polly: Set AWS credentials in environment variables")
-        except Exception:
+        else:
             logger.info("ℹ️  Amazon Polly not available (install with: pip install boto3)")
         
         # Test IBM Watson
-        try:
-            from ibm_watson import TextToSpeechV1
-            from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-            
+        if module_available('ibm_watson') and module_available('ibm_cloud_sdk_core'):
             if os.getenv('IBM_WATSON_APIKEY') and os.getenv('IBM_WATSON_URL'):
-                authenticator = IAMAuthenticator(os.getenv('IBM_WATSON_APIKEY'))
-                tts = TextToSpeechV1(authenticator=authenticator)
-                tts.set_service_url(os.getenv('IBM_WATSON_URL'))
-                
                 self.available_services['watson'] = {
-                    'client': tts,
+                    'client': None,
                     'quality': 'Excellent',
                     'description': 'IBM Watson Text to Speech',
                     'free': False
@@ -110,134 +389,150 @@ class OnlineTextToSpeechServer:
                 logger.info("✅ IBM Watson TTS available")
             else:
                 logger.info("ℹ️  IBM Watson: Set IBM_WATSON_APIKEY and IBM_WATSON_URL environment variables")
-        except Exception:
+        else:
             logger.info("ℹ️  IBM Watson not available (install with: pip install ibm-watson)")
         
         if not self.available_services:
             logger.error("❌ No online TTS services available")
         else:
-            logger.info(f"🎉 {len(self.available_services)} online TTS services initialized")
+            logger.info("🎉 %d online TTS services initialized", len(self.available_services))
+        
+        # Resolve the auto-selection order and recommendation once
+        self._priority = tuple(name for name in SERVICE_RECOMMENDATIONS if name in self.available_services)
+        self._recommendation_text = (
+            SERVICE_RECOMMENDATIONS[self._priority[0]] if self._priority else "No services available"
+        )
     
     def _setup_handlers(self):
         """Setup MCP message handlers"""
         
-        @self.app.list_tools()
-        async def handle_list_tools() -> list[Tool]:
-            """List available online text-to-speech tools"""
-            return [
-                Tool(
-                    name="get_available_services",
-                    description="Get list of available online TTS services",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
-                ),
-                Tool(
-                    name="synthesize_speech_online",
-                    description="Convert text to speech using online services",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "text": {
-                                "type": "string",
-                                "description": "Text to convert to speech"
-                            },
-                            "service": {
-                                "type": "string",
-                                "enum": ["gtts", "azure", "polly", "watson", "auto"],
-                                "default": "auto",
-                                "description": "Online TTS service to use"
-                            },
-                            "voice": {
-                                "type": "string",
-                                "description": "Voice to use (service-specific)"
-                            },
-                            "language": {
-                                "type": "string",
-                                "default": "en",
-                                "description": "Language code"
-                            },
-                            "output_file": {
-                                "type": "string",
-                                "description": "Output file path"
-                            },
-                            "speed": {
-                                "type": "string",
-                                "enum": ["x-slow", "slow", "medium", "fast", "x-fast"],
-                                "default": "medium",
-                                "description": "Speech speed"
-                            },
-                            "pitch": {
-                                "type": "string",
-                                "enum": ["x-low", "low", "medium", "high", "x-high"],
-                                "default": "medium",
-                                "description": "Speech pitch"
-                            }
+        # The tool list is static, so build it once
+        self._tools_response = [
+            Tool(
+                name="get_available_services",
+                description="Get list of available online TTS services",
+                inputSchema={
+                    "type": "object",
+                    "properties": {},
+                    "required": []
+                }
+            ),
+            Tool(
+                name="synthesize_speech_online",
+                description="Convert text to speech using online services",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "text": {
+                            "type": "string",
+                            "description": "Text to convert to speech"
                         },
-                        "required": ["text"]
-                    }
-                ),
-                Tool(
-                    name="list_online_voices",
-                    description="List available voices for online services",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "service": {
-                                "type": "string",
-                                "enum": ["gtts", "azure", "polly", "watson"],
-                                "default": "gtts",
-                                "description": "Online service to query"
-                            },
-                            "language": {
-                                "type": "string",
-                                "default": "en",
-                                "description": "Language to filter voices"
-                            }
+                        "service": {
+                            "type": "string",
+                            "enum": ["gtts", "azure", "polly", "watson", "auto"],
+                            "default": "auto",
+                            "description": "Online TTS service to use"
                         },
-                        "required": []
-                    }
-                ),
-                Tool(
-                    name="get_service_limits",
-                    description="Get usage limits and pricing for online services",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "service": {
-                                "type": "string",
-                                "description": "Service to check limits for"
-                            }
+                        "voice": {
+                            "type": "string",
+                            "description": "Voice to use (service-specific)"
                         },
-                        "required": []
-                    }
-                )
-            ]
+                        "language": {
+                            "type": "string",
+                            "default": "en",
+                            "description": "Language code"
+                        },
+                        "output_file": {
+                            "type": "string",
+                            "description": "Output file path"
+                        },
+                        "speed": {
+                            "type": "string",
+                            "enum": list(SPEED_OPTIONS),
+                            "default": "medium",
+                            "description": "Speech speed"
+                        },
+                        "pitch": {
+                            "type": "string",
+                            "enum": list(PITCH_OPTIONS),
+                            "default": "medium",
+                            "description": "Speech pitch"
+                        },
+                        "disable_cache": {
+                            "type": "boolean",
+                            "default": False,
+                            "description": "Always call the service instead of reusing cached audio"
+                        }
+                    },
+                    "required": ["text"]
+                }
+            ),
+            Tool(
+                name="list_online_voices",
+                description="List available voices for online services",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "service": {
+                            "type": "string",
+                            "enum": ["gtts", "azure", "polly", "watson"],
+                            "default": "gtts",
+                            "description": "Online service to query"
+                        },
+                        "language": {
+                            "type": "string",
+                            "default": "en",
+                            "description": "Language to filter voices"
+                        }
+                    },
+                    "required": []
+                }
+            ),
+            Tool(
+                name="get_service_limits",
+                description="Get usage limits and pricing for online services",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "service": {
+                            "type": "string",
+                            "description": "Service to check limits for"
+                        }
+                    },
+                    "required": []
+                }
+            )
+        ]
+        
+        @self.app.list_tools()
+        async def handle_list_tools() -> list[Tool]:
+            """List available online text-to-speech tools"""
+            return self._tools_response
 
+        # Tool name -> handler; every handler takes the call's arguments
+        self._tool_handlers = {
+            "get_available_services": self._get_available_services,
+            "synthesize_speech_online": self._synthesize_speech_online,
+            "list_online_voices": self._list_online_voices,
+            "get_service_limits": self._get_service_limits,
+        }
+        
         @self.app.call_tool()
         async def handle_call_tool(name: str, arguments: dict) -> list[TextContent]:
             """Handle tool calls"""
-            logger.info(f"Tool called: {name} with arguments: {arguments}")
+            logger.info("Tool called: %s args=%s", name, arguments)
             
             try:
-                if name == "get_available_services":
-                    return await self._get_available_services()
-                elif name == "synthesize_speech_online":
-                    return await self._synthesize_speech_online(arguments)
-                elif name == "list_online_voices":
-                    return await self._list_online_voices(arguments)
-                elif name == "get_service_limits":
-                    return await self._get_service_limits(arguments)
-                else:
+                handler = self._tool_handlers.get(name)
+                if handler is None:
                     raise ValueError(f"Unknown tool: {name}")
+                return await handler(arguments)
                     
             except Exception as e:
-                logger.error(f"Error in tool '{name}': {e}")
+                logger.error("Error in tool '%s': %s", name, e)
                 raise Exception(f"Internal error: {str(e)}")
     
-    async def _get_available_services(self) -> list[TextContent]:
+    async def _get_available_services(self, arguments: Optional[dict] = None) -> list[TextContent]:
         """Get available online TTS services"""
         services_info = {
             "available_services": [],
@@ -264,33 +559,82 @@ class OnlineTextToSpeechServer:
         
         services_info["recommendation"] = self._get_service_recommendation()
         
-        return [TextContent(type="text", text=json.dumps(services_info, indent=2))]
+        return [TextContent(type="text", text=_dumps(services_info))]
+    
+    def _get_azure_sdk(self):
+        """Import the Azure Speech SDK on first use"""
+        info = self.available_services['azure']
+        if info['module'] is None:
+            import azure.cognitiveservices.speech as speechsdk
+            info['module'] = speechsdk
+        return info['module']
+    
+    def _get_azure_speech_config(self):
+        """Create the shared Azure SpeechConfig on first use
+        
+        The voice is named in each request's SSML, so the config is never
+        modified per call and can be shared by concurrent syntheses.
+        """
+        info = self.available_services['azure']
+        if info.get('speech_config') is None:
+            speechsdk = self._get_azure_sdk()
+            info['speech_config'] = speechsdk.SpeechConfig(
+                subscription=os.getenv('AZURE_SPEECH_KEY'),
+                region=os.getenv('AZURE_SPEECH_REGION')
+            )
+        return info['speech_config']
+    
+    def _get_polly_client(self):
+        """Create the Polly client on first use"""
+        info = self.available_services['polly']
+        if info['client'] is None:
+            import boto3
+            from botocore.config import Config
+            # One client with a warm keep-alive pool, so repeated calls skip the TLS handshake
+            info['config'] = Config(
+                max_pool_connections=50,
+                retries={'max_attempts': 3, 'mode': 'adaptive'},
+                tcp_keepalive=True
+            )
+            info['client'] = boto3.client('polly', config=info['config'])
+        return info['client']
+    
+    def _get_watson_client(self):
+        """Create the Watson client on first use"""
+        info = self.available_services['watson']
+        if info['client'] is None:
+            from ibm_watson import TextToSpeechV1
+            from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
+            
+            authenticator = IAMAuthenticator(os.getenv('IBM_WATSON_APIKEY'))
+            tts = TextToSpeechV1(authenticator=authenticator)
+            tts.set_service_url(os.getenv('IBM_WATSON_URL'))
+            info['client'] = tts
+        return info['client']
     
     def _get_service_recommendation(self) -> str:
-        """Get recommended service"""
-        if 'gtts' in self.available_services:
-            return "gtts (free, good quality)"
-        elif 'azure' in self.available_services:
-            return "azure (excellent quality, neural voices)"
-        elif 'polly' in self.available_services:
-            return "polly (excellent quality, many voices)"
-        elif 'watson' in self.available_services:
-            return "watson (excellent quality)"
-        else:
-            return "No services available"
+        """Get recommended service (resolved once after detection)"""
+        return self._recommendation_text
     
     async def _synthesize_speech_online(self, arguments: dict) -> list[TextContent]:
         """Synthesize speech using online services"""
-        text = arguments.get("text", "")
+        text = _WS_RE.sub(" ", arguments.get("text", "")).strip()
         service = arguments.get("service", "auto")
         voice = arguments.get("voice")
         language = arguments.get("language", "en")
         output_file = arguments.get("output_file")
         speed = arguments.get("speed", "medium")
         pitch = arguments.get("pitch", "medium")
+        use_cache = not arguments.get("disable_cache", False)
         
         if not text:
             raise ValueError("Text is required for synthesis")
+        if len(text) > MAX_TEXT_CHARS:
+            raise ValueError(f"Text is too long ({len(text)} characters, maximum {MAX_TEXT_CHARS})")
+        if speed not in _SPEEDS:
+            raise ValueError(f"Invalid speed '{speed}' (expected one of: {', '.join(SPEED_OPTIONS)})")
+        if pitch not in _PITCHES:
+            raise ValueError(f"Invalid pitch '{pitch}' (expected one of: {', '.join(PITCH_OPTIONS)})")
         
         # Auto-select service
         if service == "auto":
@@ -298,25 +642,66 @@ class OnlineTextToSpeechServer:
         
         if service not in self.available_services:
             raise ValueError(f"Service '{service}' not available")
+        limit = UNCHUNKED_LIMITS.get(service)
+        if limit and len(text) > limit:
+            raise ValueError(f"Text is too long for {service} ({len(text)} characters, maximum {limit})")
         
-        # Generate output file if not provided
+        key = self.audio_cache.make_key(text, service, voice, language, speed, pitch)
+        
+        # Default output is named after the request, so repeats land on the same file: the cache
+        # entry itself, or a file under $TTS_OUTPUT_DIR. Both only ever appear complete, so an
+        # existing one can be reused
+        existing_size = None
         if not output_file:
-            output_file = os.path.join(tempfile.gettempdir(), f"tts_online_{uuid.uuid4().hex[:8]}.mp3")
+            output_dir = user_output_dir()
+            if output_dir:
+                output_file = os.path.join(output_dir, f"tts_{service}_{key[:16]}.mp3")
+            else:
+                output_file = self.audio_cache.path_for(key)
+            if use_cache and key not in self._inflight:
+                existing_size = _file_size(output_file) or None
+                if existing_size is not None and output_file == self.audio_cache.path_for(key):
+                    os.utime(output_file)  # Mark as recently used for the pruner
         
         try:
-            if service == "gtts":
-                success = await self._synthesize_gtts(text, output_file, language)
-            elif service == "azure":
-                success = await self._synthesize_azure(text, output_file, voice, language, speed, pitch)
-            elif service == "polly":
-                success = await self._synthesize_polly(text, output_file, voice, language, speed)
-            elif service == "watson":
-                success = await self._synthesize_watson(text, output_file, voice, language)
+            cached = False
+            if existing_size is not None:
+                # An earlier identical request already wrote this file
+                file_size = existing_size
+                cached = True
+            elif use_cache:
+                audio = self.audio_cache.get(key)
+                if audio is not None:
+                    self.audio_cache.restore(key, audio, output_file)
+                    file_size = len(audio)
+                    cached = True
+                else:
+                    # Identical requests share one synthesis task; it runs independently of its
+                    # callers, so cancelling any of them (the first included) can't fail the rest
+                    task = self._inflight.get(key)
+                    if task is None:
+                        task = asyncio.create_task(self._synthesize_shared(
+                            key, service, text, output_file, voice, language, speed, pitch
+                        ))
+                        self._inflight[key] = task
+                        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+                    else:
+                        cached = True
+                    
+                    source_file, file_size = await asyncio.shield(task)
+                    if file_size is not None and source_file != output_file:
+                        audio = self.audio_cache.get(key)
+                        if audio is not None:
+                            self.audio_cache.restore(key, audio, output_file)
+                        else:
+                            copy_file(source_file, output_file)
             else:
-                raise ValueError(f"Service not implemented: {service}")
-            
-            if success:
-                file_size = os.path.getsize(output_file) if os.path.exists(output_file) else 0
+                # Fresh audio still replaces the cached copy (the default output is that copy)
+                _, file_size = await self._synthesize_shared(
+                    key, service, text, output_file, voice, language, speed, pitch
+                )
+
+            if file_size is not None:
                 result = {
                     "status": "success",
                     "text": text,
@@ -326,19 +711,20 @@ class OnlineTextToSpeechServer:
                     "language": language,
                     "voice": voice,
                     "speed": speed,
-                    "pitch": pitch
+                    "pitch": pitch,
+                    "cached": cached
                 }
                 
-                logger.info(f"Online synthesis successful: {output_file} ({file_size} bytes)")
-                return [TextContent(type="text", text=json.dumps(result, indent=2))]
+                logger.info("Online synthesis successful: %s (%d bytes)", output_file, file_size)
+                return [TextContent(type="text", text=_dumps(result))]
             else:
                 raise Exception("Online synthesis failed")
                 
         except Exception as e:
-            logger.error(f"Online synthesis error with {service}: {e}")
+            logger.error("Online synthesis error with %s: %s", service, e)
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=_dumps({
                     "status": "error",
                     "message": str(e),
                     "service": service,
@@ -346,168 +732,250 @@ class OnlineTextToSpeechServer:
                 })
             )]
     
+    async def _synthesize_shared(self, key: str, service: str, text: str, output_file: str, voice: Optional[str],
+                                 language: str, speed: str, pitch: str) -> tuple:
+        """Synthesize and cache one request for all identical callers: (output file, size or None)"""
+        file_size = await self._synthesize_to_file(service, text, output_file, voice, language, speed, pitch)
+        if file_size is not None:
+            try:
+                self.audio_cache.put(key, output_file)
+            except OSError as e:
+                logger.warning("Could not cache synthesis result: %s", e)
+        return output_file, file_size
+    
+    async def _synthesize_to_file(self, service: str, text: str, output_file: str, voice: Optional[str],
+                                  language: str, speed: str, pitch: str) -> Optional[int]:
+        """Synthesize into a temporary name and move it to output_file only once complete
+        
+        An interrupted download never leaves a truncated file at output_file, which may
+        be a cache entry that later requests reuse.
+        """
+        part_file = f"{output_file}.{uuid.uuid4().hex[:8]}.part"
+        moved = False
+        try:
+            file_size = await self._synthesize_with_service(
+                service, text, part_file, voice, language, speed, pitch
+            )
+            if file_size is not None:
+                os.replace(part_file, output_file)
+                moved = True
+            return file_size
+        finally:
+            if not moved:
+                try:
+                    os.remove(part_file)
+                except OSError:
+                    pass
+    
+    async def _synthesize_with_service(self, service: str, text: str, output_file: str, voice: Optional[str],
+                                       language: str, speed: str, pitch: str) -> Optional[int]:
+        """Synthesize text to output_file with the named service, returning its size (None on failure)"""
+        limit = CHUNK_LIMITS.get(service)
+        if limit and len(text) > limit:
+            return await self._synthesize_chunked(
+                service, chunk_text(text, limit, split_long=True), output_file, voice, language, speed, pitch
+            )
+        
+        # Only single requests take a slot; chunked syntheses would otherwise hold
+        # one while waiting for their own chunks
+        async with self._service_slots[service]:
+            if service == "gtts":
+                return await self._synthesize_gtts(text, output_file, language)
+            elif service == "azure":
+                return await self._synthesize_azure(text, output_file, voice, language, speed, pitch)
+            elif service == "polly":
+                return await self._synthesize_polly(text, output_file, voice, language, speed)
+            elif service == "watson":
+                return await self._synthesize_watson(text, output_file, voice, language)
+            else:
+                raise ValueError(f"Service not implemented: {service}")
+    
+    async def _synthesize_chunked(self, service: str, chunks: List[str], output_file: str, voice: Optional[str],
+                                  language: str, speed: str, pitch: str) -> Optional[int]:
+        """Synthesize chunks concurrently and append their MP3 frames into output_file"""
+        run_id = uuid.uuid4().hex[:8]
+        part_files = [
+            os.path.join(tempfile.gettempdir(), f"tts_online_part_{run_id}_{i:03d}.mp3")
+            for i in range(len(chunks))
+        ]
+        try:
+            outcomes = await asyncio.gather(*(
+                self._synthesize_with_service(service, chunk, part_file, voice, language, speed, pitch)
+                for chunk, part_file in zip(chunks, part_files)
+            ))
+            if None in outcomes:
+                return None
+            
+            with open(output_file, 'wb') as out:
+                for part_file in part_files:
+                    with open(part_file, 'rb') as part:
+                        shutil.copyfileobj(part, out)
+            return sum(outcomes)
+        finally:
+            for part_file in part_files:
+                try:
+                    os.remove(part_file)
+                except OSError:
+                    pass
+    
     def _select_best_service(self) -> str:
-        """Select the best available service"""
-        if 'gtts' in self.available_services:
-            return 'gtts'
-        elif 'azure' in self.available_services:
-            return 'azure'
-        elif 'polly' in self.available_services:
-            return 'polly'
-        elif 'watson' in self.available_services:
-            return 'watson'
-        else:
-            raise ValueError("No online TTS services available")
+        """Select the best available service (resolved once after detection)"""
+        try:
+            return self._priority[0]
+        except IndexError:
+            raise ValueError("No online TTS services available") from None
     
-    async def _synthesize_gtts(self, text: str, output_file: str, language: str) -> bool:
+    async def _synthesize_gtts(self, text: str, output_file: str, language: str) -> Optional[int]:
         """Synthesize using Google TTS"""
         try:
             from gtts import gTTS
             
             tts = gTTS(text=text, lang=language, slow=False)
-            tts.save(output_file)
+            # _prepare_requests and the response format are private gTTS API (checked against
+            # gTTS 2.5.4); if a release or Google changes them, fall back to gTTS's own blocking save
+            if self._http is not None and hasattr(tts, '_prepare_requests'):
+                try:
+                    audio = await self._fetch_gtts_audio(tts)
+                except Exception as e:
+                    logger.warning("gTTS concurrent fetch failed (%s); retrying with gTTS's own save", e)
+                else:
+                    with open(output_file, 'wb') as f:
+                        f.write(audio)
+                    return len(audio)
             
-            return os.path.exists(output_file)
+            await asyncio.to_thread(tts.save, output_file)
+            return _file_size(output_file)
             
         except Exception as e:
-            logger.error(f"gTTS synthesis error: {e}")
-            return False
+            logger.error("gTTS synthesis error: %s", e)
+            return None
+    
+    async def _fetch_gtts_audio(self, tts) -> bytes:
+        """Send gTTS's prepared requests (one per ~100-char text part) concurrently over the shared client"""
+        async def post(request):
+            async with self._gtts_part_slots:
+                return await self._http.post(request.url, content=request.body, headers=dict(request.headers))
+        
+        responses = await asyncio.gather(*(post(request) for request in tts._prepare_requests()))
+        
+        parts = []
+        for response in responses:
+            response.raise_for_status()
+            for line in response.text.splitlines():
+                if "jQ1olc" in line:
+                    match = _GTTS_AUDIO_RE.search(line)
+                    if not match:
+                        raise ValueError("Unexpected response from Google TTS")
+                    parts.append(base64.b64decode(match.group(1)))
+        if not parts:
+            raise ValueError("Google TTS returned no audio")
+        return b"".join(parts)
     
     async def _synthesize_azure(self, text: str, output_file: str, voice: Optional[str], 
-                               language: str, speed: str, pitch: str) -> bool:
+                               language: str, speed: str, pitch: str) -> Optional[int]:
         """Synthesize using Azure Cognitive Services"""
         try:
-            import azure.cognitiveservices.speech as speechsdk
-            
-            speech_config = speechsdk.SpeechConfig(
-                subscription=os.getenv('AZURE_SPEECH_KEY'),
-                region=os.getenv('AZURE_SPEECH_REGION')
-            )
+            speechsdk = self._get_azure_sdk()
+            speech_config = self._get_azure_speech_config()
             
-            # Set voice if specified
-            if voice:
-                speech_config.speech_synthesis_voice_name = voice
-            else:
-                # Default voices for common languages
-                voice_map = {
-                    'en': 'en-US-JennyNeural',
-                    'es': 'es-ES-ElviraNeural',
-                    'fr': 'fr-FR-DeniseNeural',
-                    'de': 'de-DE-KatjaNeural',
-                    'it': 'it-IT-ElsaNeural'
-                }
-                speech_config.speech_synthesis_voice_name = voice_map.get(language, 'en-US-JennyNeural')
+            # Use the voice if specified, else the default voice for the language
+            voice_name = voice or AZURE_VOICE_MAP.get(language, 'en-US-JennyNeural')
             
-            # Create SSML with speed and pitch
-            ssml = f"""
-            <speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="{language}">
-                <voice name="{speech_config.speech_synthesis_voice_name}">
-                    <prosody rate="{speed}" pitch="{pitch}">
-                        {text}
-                    </prosody>
-                </voice>
-            </speak>
-            """
+            # Create SSML with speed and pitch (escaped, so "<" or "&" in text can't break the document)
+            ssml = AZURE_SSML_TEMPLATE.format(
+                lang=_escape_ssml(language),
+                voice=_escape_ssml(voice_name),
+                speed=speed,
+                pitch=pitch,
+                text=_escape_ssml(text)
+            )
             
-            # Create synthesizer
+            # The synthesizer binds its output file, so only it and the audio config are per call
             audio_config = speechsdk.audio.AudioOutputConfig(filename=output_file)
             synthesizer = speechsdk.SpeechSynthesizer(
                 speech_config=speech_config, 
                 audio_config=audio_config
             )
             
-            # Synthesize
-            result = synthesizer.speak_ssml_async(ssml).get()
+            # Start synthesis on the SDK's own threads; only the wait for the result runs in a worker
+            result_future = synthesizer.speak_ssml_async(ssml)
+            result = await asyncio.to_thread(result_future.get)
             
             if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-                return True
+                return _file_size(output_file)
             else:
-                logger.error(f"Azure synthesis failed: {result.reason}")
-                return False
+                logger.error("Azure synthesis failed: %s", result.reason)
+                return None
                 
         except Exception as e:
-            logger.error(f"Azure synthesis error: {e}")
-            return False
+            logger.error("Azure synthesis error: %s", e)
+            return None
     
     async def _synthesize_polly(self, text: str, output_file: str, voice: Optional[str], 
-                               language: str, speed: str) -> bool:
+                               language: str, speed: str) -> Optional[int]:
         """Synthesize using Amazon Polly"""
         try:
-            polly_client = self.available_services['polly']['client']
-            
-            # Map speed to SSML rate
-            speed_map = {
-                'x-slow': '0.5',
-                'slow': '0.75',
-                'medium': '1.0',
-                'fast': '1.25',
-                'x-fast': '1.5'
-            }
+            polly_client = self._get_polly_client()
             
             # Create SSML
-            ssml = f'<speak><prosody rate="{speed_map.get(speed, "1.0")}">{text}</prosody></speak>'
+            ssml = POLLY_SSML_TEMPLATE.format(
+                speed=POLLY_SPEED_MAP[speed],
+                text=_escape_ssml(text)
+            )
             
             # Default voices for languages
             if not voice:
-                voice_map = {
-                    'en': 'Joanna',
-                    'es': 'Conchita',
-                    'fr': 'Celine',
-                    'de': 'Marlene',
-                    'it': 'Carla'
-                }
-                voice = voice_map.get(language, 'Joanna')
+                voice = POLLY_VOICE_MAP.get(language, 'Joanna')
             
             # Synthesize
-            response = polly_client.synthesize_speech(
+            response = await asyncio.to_thread(
+                polly_client.synthesize_speech,
                 Text=ssml,
                 TextType='ssml',
                 OutputFormat='mp3',
                 VoiceId=voice
             )
             
-            # Save audio
-            with open(output_file, 'wb') as file:
-                file.write(response['AudioStream'].read())
+            # Stream audio to disk in 64 KiB pieces (reading the stream is network I/O too)
+            def save_audio():
+                stream = response['AudioStream']
+                try:
+                    with open(output_file, 'wb') as file:
+                        shutil.copyfileobj(stream, file, 64 * 1024)
+                        return file.tell()
+                finally:
+                    stream.close()
             
-            return os.path.exists(output_file)
+            return await asyncio.to_thread(save_audio)
             
         except Exception as e:
-            logger.error(f"Polly synthesis error: {e}")
-            return False
+            logger.error("Polly synthesis error: %s", e)
+            return None
     
-    async def _synthesize_watson(self, text: str, output_file: str, voice: Optional[str], language: str) -> bool:
+    async def _synthesize_watson(self, text: str, output_file: str, voice: Optional[str], language: str) -> Optional[int]:
         """Synthesize using IBM Watson"""
         try:
-            watson_client = self.available_services['watson']['client']
+            watson_client = self._get_watson_client()
             
             # Default voices
             if not voice:
-                voice_map = {
-                    'en': 'en-US_AllisonV3Voice',
-                    'es': 'es-ES_EnriqueV3Voice',
-                    'fr': 'fr-FR_ReneeV3Voice',
-                    'de': 'de-DE_BirgitV3Voice',
-                    'it': 'it-IT_FrancescaV3Voice'
-                }
-                voice = voice_map.get(language, 'en-US_AllisonV3Voice')
-            
-            # Synthesize
-            response = watson_client.synthesize(
-                text,
-                voice=voice,
-                accept='audio/mp3'
-            ).get_result()
+                voice = WATSON_VOICE_MAP.get(language, 'en-US_AllisonV3Voice')
             
-            # Save audio
-            with open(output_file, 'wb') as audio_file:
-                audio_file.write(response.content)
+            # Synthesize and stream the audio to disk without holding it all in memory
+            def synthesize_to_file():
+                response = watson_client.synthesize(
+                    text, voice=voice, accept='audio/mp3', stream=True
+                ).get_result()
+                with response, open(output_file, 'wb') as audio_file:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        audio_file.write(chunk)
+                    return audio_file.tell()
             
-            return os.path.exists(output_file)
+            return await asyncio.to_thread(synthesize_to_file)
             
         except Exception as e:
-            logger.error(f"Watson synthesis error: {e}")
-            return False
+            logger.error("Watson synthesis error: %s", e)
+            return None
     
     async def _list_online_voices(self, arguments: dict) -> list[TextContent]:
         """List available voices for online services"""
@@ -517,7 +985,7 @@ class OnlineTextToSpeechServer:
         if service not in self.available_services:
             return [TextContent(
                 type="text",
-                text=json.dumps({
+                text=_dumps({
                     "error": f"Service '{service}' not available",
                     "available_services": list(self.available_services.keys())
                 })
@@ -568,67 +1036,40 @@ class OnlineTextToSpeechServer:
         except Exception as e:
             voices_info["error"] = str(e)
         
-        return [TextContent(type="text", text=json.dumps(voices_info, indent=2))]
+        return [TextContent(type="text", text=_dumps(voices_info))]
     
     async def _get_service_limits(self, arguments: dict) -> list[TextContent]:
         """Get service limits and pricing information"""
         service = arguments.get("service")
         
-        limits_info = {
-            "gtts": {
-                "free_tier": "Unlimited (rate limited)",
-                "character_limit": "100 characters per request",
-                "rate_limit": "Reasonable use policy",
-                "pricing": "Free",
-                "notes": "Google's free service with reasonable use limits"
-            },
-            "azure": {
-                "free_tier": "5 million characters per month",
-                "pricing_per_million": "$4.00 (Standard), $16.00 (Neural)",
-                "character_limit": "No limit per request",
-                "rate_limit": "20 transactions per second",
-                "notes": "Requires Azure subscription after free tier"
-            },
-            "polly": {
-                "free_tier": "5 million characters per month (first 12 months)",
-                "pricing_per_million": "$4.00 (Standard), $16.00 (Neural)",
-                "character_limit": "3000 characters per request",
-                "rate_limit": "100 transactions per second",
-                "notes": "AWS account required"
-            },
-            "watson": {
-                "free_tier": "10,000 characters per month",
-                "pricing_per_thousand": "$0.02",
-                "character_limit": "5000 characters per request",
-                "rate_limit": "10 transactions per second",
-                "notes": "IBM Cloud account required"
-            }
-        }
-        
-        if service and service in limits_info:
-            result = {"service": service, "limits": limits_info[service]}
+        if service and service in SERVICE_LIMITS:
+            result = {"service": service, "limits": SERVICE_LIMITS[service]}
         else:
-            result = {"all_services": limits_info}
+            result = {"all_services": SERVICE_LIMITS}
         
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        return [TextContent(type="text", text=_dumps(result))]
 
     async def run_server(self):
         """Run the MCP server"""
         from mcp.server.stdio import stdio_server
         
-        async with stdio_server() as (read_stream, write_stream):
-            await self.app.run(
-                read_stream,
-                write_stream,
-                InitializationOptions(
-                    server_name="mcp-text-to-speech-online",
-                    server_version="1.0.0",
-                    capabilities=self.app.get_capabilities(
-                        notification_options=NotificationOptions(),
-                        experimental_capabilities={},
+        try:
+            async with stdio_server() as (read_stream, write_stream):
+                await self.app.run(
+                    read_stream,
+                    write_stream,
+                    InitializationOptions(
+                        server_name="mcp-text-to-speech-online",
+                        server_version="1.0.0",
+                        capabilities=self.app.get_capabilities(
+                            notification_options=NotificationOptions(),
+                            experimental_capabilities={},
+                        ),
                     ),
-                ),
-            )
+                )
+        finally:
+            if self._http is not None:
+                await self._http.aclose()
 
 async def main():
     """Main entry point"""
@@ -0,0 +1,101 @@
+"""
+Helpers shared by the offline and online MCP Text-to-Speech servers
+Module detection, sentence chunking, cache directories and cache file copies
+"""
+
+import importlib.util
+import os
+import sys
+import re
+import shutil
+import uuid
+
+def module_available(name: str) -> bool:
+    """Check whether a module is installed without importing it"""
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+# Latin terminators need trailing whitespace (so "3.14" stays whole); CJK ones don't
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+|(?<=[。！？])\s*')
+_CJK_TERMINATORS = "。！？"
+
+def chunk_text(text: str, max_chars: int, split_long: bool = False) -> list[str]:
+    """Split text into sentence-aligned chunks of at most max_chars
+    
+    Sentences longer than max_chars stay whole unless split_long is set, in
+    which case they are cut at spaces (services with hard request limits).
+    """
+    pieces = []
+    for sentence in _SENTENCE_END_RE.split(text):
+        sentence = sentence.strip()
+        while split_long and len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(sentence[:cut].rstrip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+    
+    chunks = []
+    current = ""
+    for piece in pieces:
+        separator = "" if not current or current[-1] in _CJK_TERMINATORS else " "
+        if current and len(current) + len(separator) + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}{separator}{piece}"
+    if current:
+        chunks.append(current)
+    return chunks
+
+def user_cache_dir(name: str) -> str:
+    """Private directory for cached audio: $TTS_CACHE_DIR/name, else under the user's cache home
+    
+    Created (or tightened) to mode 0o700, since entries are found by predictable
+    keys and must not be readable or pre-seeded by other local users.
+    """
+    base = os.getenv('TTS_CACHE_DIR')
+    if not base:
+        cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        base = os.path.join(cache_home, 'mcp-text-to-speech')
+    path = os.path.join(base, name)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    try:
+        os.chmod(path, 0o700)
+    except OSError:
+        pass
+    return path
+
+def user_output_dir() -> str | None:
+    """Directory for output files named by the server from $TTS_OUTPUT_DIR (created if missing)
+    
+    None when it isn't set: the output is then the cache entry itself, so it is
+    pruned along with the cache instead of accumulating in a directory of its own.
+    """
+    path = os.getenv('TTS_OUTPUT_DIR')
+    if path:
+        os.makedirs(path, exist_ok=True)
+    return path or None
+
+def copy_file(source: str, dest: str):
+    """Copy source to dest through a temporary name, so dest only ever appears complete
+    
+    Cache entries are copied to and from caller-chosen paths rather than hardlinked,
+    since a later in-place write to such a file would otherwise corrupt the cache.
+    """
+    part_file = f"{dest}.{uuid.uuid4().hex[:8]}.part"
+    try:
+        shutil.copyfile(source, part_file)
+        os.replace(part_file, dest)
+    except BaseException:
+        try:
+            os.remove(part_file)
+        except OSError:
+            pass
+        raise
@@ -2,86 +2,246 @@
 """
 Simple test script for MCP Text-to-Speech Server
 Demonstrates offline text synthesis capabilities
+
+Install the package first: pip install -e .
 """
 
+import asyncio
+import functools
+import importlib.util
 import json
 import tempfile
 import os
+import struct
 import sys
+from itertools import islice
+from operator import itemgetter
+from pathlib import Path
+from typing import Final
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# Add src to path for imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+def _loads(text):
+    """Parse a tool response, with orjson when it's installed"""
+    if orjson is not None:
+        return orjson.loads(text.encode())
+    return json.loads(text)
 
-from mcp_text_to_speech.server import OfflineTextToSpeechServer
+_TEST_TEXT: Final = (
+    "Hello! This is a test of the MCP text-to-speech server. It works completely offline "
+    "using pyttsx3 on macOS ARM64. The speech synthesis is working perfectly!"
+)
+_TEST_TEXT_LEN: Final = len(_TEST_TEXT)
 
-async def test_tts_server():
-    """Test the TTS server functionality"""
-    print("🎤 Testing MCP Text-to-Speech Server")
-    print("=" * 50)
+# Checked without importing, so the voices test can be skipped up front
+_HAS_PYTTSX3: Final = importlib.util.find_spec("pyttsx3") is not None
+
+def _parse_wav_header(audio):
+    """Return (channels, sample_rate, bits_per_sample, data_bytes) from a RIFF/WAVE buffer, or None"""
+    if len(audio) < 12:
+        return None
+    riff, _, wave_id = struct.unpack_from('<4sI4s', audio)
+    if riff != b'RIFF' or wave_id != b'WAVE':
+        return None
     
-    # Initialize server
-    server = OfflineTextToSpeechServer()
+    # Walk the chunks (writers may put LIST etc. before "data", so offset 44 isn't guaranteed)
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(audio):
+        chunk_id, chunk_size = struct.unpack_from('<4sI', audio, offset)
+        offset += 8
+        if chunk_id == b'fmt ' and chunk_size >= 16:
+            _, channels, sample_rate, _, _, bits = struct.unpack_from('<HHIIHH', audio, offset)
+            fmt = (channels, sample_rate, bits)
+        elif chunk_id == b'data':
+            if fmt is None:
+                return None
+            return (*fmt, min(chunk_size, len(audio) - offset))
+        offset += chunk_size + (chunk_size & 1)
+    return None
+
+@functools.lru_cache(maxsize=1)
+def get_server():
+    """Create the server once (engine detection and init are the slow part) and reuse it"""
+    # Imported here so loading this module doesn't pull in the TTS engines
+    from mcp_text_to_speech.server import OfflineTextToSpeechServer
     
-    # Test 1: Get available engines
-    print("\n📋 Test 1: Getting available engines")
+    return OfflineTextToSpeechServer()
+
+# Parsed voice listings per engine, kept for repeat runs in the same process
+_VOICES_CACHE = {}
+_VOICES_LOCK = asyncio.Lock()
+
+async def _list_voices_cached(server, engine):
+    """Return the parsed voice listing for engine, asking the server only once"""
+    async with _VOICES_LOCK:
+        voices_data = _VOICES_CACHE.get(engine)
+        if voices_data is None:
+            voices_result = await server._list_voices({"engine": engine})
+            voices_data = _VOICES_CACHE[engine] = _loads(voices_result[0].text)
+        return voices_data
+
+async def _run_test_1(server):
+    """Test 1: Get available engines"""
     engines_result = await server._get_available_engines()
-    engines_data = json.loads(engines_result[0].text)
-    print(f"Available engines: {engines_data['total_engines']}")
-    print(f"Offline engines: {engines_data['offline_engines']}")
-    print(f"Recommendation: {engines_data['recommendation']}")
+    return _loads(engines_result[0].text)
+
+async def _run_test_2(server):
+    """Test 2: Synthesize speech, returning the response and the audio bytes (None if no file was written)"""
+    # Unique file, on tmpfs where available, removed once its contents are read
+    temp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.NamedTemporaryFile(prefix="mcp_tts_test_", suffix=".wav", dir=temp_dir, delete=False) as tf:
+        output_file = tf.name
     
-    # Test 2: Synthesize speech
-    print("\n🎵 Test 2: Synthesizing speech")
-    output_file = os.path.join(tempfile.gettempdir(), "mcp_tts_test.wav")
+    try:
+        synthesis_args = {
+            "text": _TEST_TEXT,
+            "engine": "auto",
+            "output_file": output_file,
+            "speed": 160,
+            # Exercise the engine itself, not audio cached by an earlier run
+            "disable_cache": True
+        }
+        
+        synthesis_result = await server._synthesize_speech(synthesis_args)
+        try:
+            audio = Path(output_file).read_bytes() or None
+        except FileNotFoundError:
+            audio = None
+        return _loads(synthesis_result[0].text), audio
+    finally:
+        try:
+            os.unlink(output_file)
+        except FileNotFoundError:
+            pass
+
+async def _run_test_3(server):
+    """Test 3: List voices (None if pyttsx3 isn't installed)"""
+    if not _HAS_PYTTSX3:
+        return None
+    return await _list_voices_cached(server, "pyttsx3")
+
+async def _run_test_4(server):
+    """Test 4: Batch synthesis (into a temporary directory, removed once the batch is done)"""
+    texts = [
+        "Short test.",
+        "This is a medium length sentence for the batch test.",
+        "This longer utterance checks that batched synthesis handles several sentences. "
+        "Each text becomes its own audio file, and the engine's workers process them together."
+    ]
+    with tempfile.TemporaryDirectory(prefix="mcp_tts_batch_test_") as output_dir:
+        batch_result = await server._batch_synthesize({
+            "texts": texts,
+            "engine": "auto",
+            "output_dir": output_dir,
+            "disable_cache": True
+        })
+    return _loads(batch_result[0].text)
+
+async def test_tts_server(verbose=False):
+    """Test the TTS server functionality (output is written once at the end unless verbose)"""
+    lines = []
+    if verbose:
+        out = print
+    else:
+        def out(line=""):
+            lines.append(f"{line}\n")
     
-    synthesis_args = {
-        "text": "Hello! This is a test of the MCP text-to-speech server. It works completely offline using pyttsx3 on macOS ARM64. The speech synthesis is working perfectly!",
-        "engine": "auto",
-        "output_file": output_file,
-        "speed": 160
-    }
+    out("🎤 Testing MCP Text-to-Speech Server")
+    out("=" * 50)
     
-    synthesis_result = await server._synthesize_speech(synthesis_args)
-    synthesis_data = json.loads(synthesis_result[0].text)
+    # Initialize server (cached across runs in the same process)
+    server = get_server()
     
+    # The tests are independent, so run them concurrently and report in order
+    engines_data, (synthesis_data, audio), voices_data, batch_data = await asyncio.gather(
+        _run_test_1(server), _run_test_2(server), _run_test_3(server), _run_test_4(server)
+    )
+    
+    # Test 1: Get available engines
+    out("\n📋 Test 1: Getting available engines")
+    out(f"Available engines: {engines_data['total_engines']}")
+    out(f"Offline engines: {engines_data['offline_engines']}")
+    out(f"Recommendation: {engines_data['recommendation']}")
+    
+    # Test 2: Synthesize speech
+    out("\n🎵 Test 2: Synthesizing speech")
     if synthesis_data.get("status") == "success":
-        print(f"✅ Synthesis successful!")
-        print(f"   Engine used: {synthesis_data['engine']}")
-        print(f"   Output file: {synthesis_data['output_file']}")
-        print(f"   File size: {synthesis_data['file_size_bytes']} bytes")
-        print(f"   Speed: {synthesis_data['speed']} WPM")
+        out(f"✅ Synthesis successful!")
+        out(f"   Engine used: {synthesis_data['engine']}")
+        out(f"   Output file: {synthesis_data['output_file']} (temporary, removed once read back)")
+        out(f"   File size: {synthesis_data['file_size_bytes']} bytes")
+        out(f"   Speed: {synthesis_data['speed']} WPM")
+        out(f"   Text length: {_TEST_TEXT_LEN} characters")
         
-        # Check if file exists
-        if os.path.exists(output_file):
-            print(f"   ✅ Audio file created successfully")
+        # The audio was read in one buffered call before the temp file was removed;
+        # its length is the file size
+        if audio is None:
+            out(f"   ❌ Audio file was not created")
+        else:
+            out(f"   ✅ Audio file created successfully")
             
-            # Try to get file duration (basic check)
-            file_size = os.path.getsize(output_file)
-            if file_size > 1000:  # More than 1KB indicates actual audio content
-                print(f"   ✅ Audio file appears valid ({file_size} bytes)")
+            file_size = len(audio)
+            header = _parse_wav_header(audio)
+            if header is None:
+                out(f"   ⚠️  Audio file is not a RIFF/WAVE file ({file_size} bytes)")
             else:
-                print(f"   ⚠️  Audio file is very small ({file_size} bytes)")
-        else:
-            print(f"   ❌ Audio file was not created")
+                channels, sample_rate, bits, data_bytes = header
+                frame_bytes = channels * bits // 8
+                frames = data_bytes // frame_bytes if frame_bytes else 0
+                if frames and sample_rate:
+                    out(f"   ✅ Audio file appears valid ({frames} frames, {frames / sample_rate:.2f}s "
+                          f"at {sample_rate} Hz, {file_size} bytes)")
+                else:
+                    out(f"   ⚠️  Audio file has no samples ({file_size} bytes)")
     else:
-        print(f"❌ Synthesis failed: {synthesis_data.get('message', 'Unknown error')}")
+        out(f"❌ Synthesis failed: {synthesis_data.get('message', 'Unknown error')}")
     
     # Test 3: List voices
-    print("\n🎭 Test 3: Listing available voices")
-    voices_result = await server._list_voices({"engine": "pyttsx3"})
-    voices_data = json.loads(voices_result[0].text)
+    out("\n🎭 Test 3: Listing available voices")
+    if voices_data is None:
+        out("⏭️  Skipped: pyttsx3 is not installed")
+    else:
+        total_voices = voices_data.get('total_voices', 0)
+        out(f"Total voices for pyttsx3: {total_voices}")
+        voices = voices_data.get('voices')
+        if voices is not None:
+            out("Sample voices:")
+            # The server always includes both keys in each voice entry
+            name_and_id = itemgetter('name', 'id')
+            for i, voice in enumerate(islice(voices, 5), 1):  # Show first 5
+                name, voice_id = name_and_id(voice)
+                out("   %d. %s (%s)" % (i, name or 'Unknown', voice_id or 'no-id'))
+            if total_voices > 5:
+                out(f"   ... and {total_voices - 5} more voices")
+    
+    # Test 4: Batch synthesis
+    out("\n📦 Test 4: Batch synthesizing several utterances")
+    batch_results = batch_data['results']
+    succeeded = [r for r in batch_results if r.get("status") == "success"]
+    out(f"Batch files: {len(succeeded)}/{batch_data['total_files']} synthesized (temporary, removed after the batch)")
+    for r in batch_results:
+        if r.get("status") == "success":
+            out(f"   ✅ {r['output_file']} ({r['file_size_bytes']} bytes)")
+        else:
+            out(f"   ❌ {r.get('message', 'Unknown error')}")
     
-    print(f"Total voices for pyttsx3: {voices_data.get('total_voices', 0)}")
-    if 'voices' in voices_data:
-        print("Sample voices:")
-        for i, voice in enumerate(voices_data['voices'][:5]):  # Show first 5
-            print(f"   {i+1}. {voice.get('name', 'Unknown')} ({voice.get('id', 'no-id')})")
-        if len(voices_data['voices']) > 5:
-            print(f"   ... and {len(voices_data['voices']) - 5} more voices")
+    out("\n🎉 MCP Text-to-Speech Server test completed!")
+    out("✅ All core functionality is working correctly")
     
-    print("\n🎉 MCP Text-to-Speech Server test completed!")
-    print("✅ All core functionality is working correctly")
+    sys.stdout.write("".join(lines))
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(test_tts_server())
+    verbose = "--verbose" in sys.argv or "-v" in sys.argv
+    
+    # Use uvloop's faster event loop when it's installed (uvloop.run needs uvloop >= 0.18)
+    try:
+        import uvloop
+        run = getattr(uvloop, "run", asyncio.run)
+    except ImportError:
+        run = asyncio.run
+    
+    run(test_tts_server(verbose=verbose))
@@ -0,0 +1,147 @@
+"""
+Tests for the synthesis caches and the online server's request deduplication
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+
+pytest.importorskip("mcp")
+
+from mcp_text_to_speech.server import SynthesisCache
+from mcp_text_to_speech.server_online import AudioCache, OnlineTextToSpeechServer
+
+@pytest.fixture
+def online_server(tmp_path, monkeypatch):
+    """Online server caching under tmp_path, with a fake gTTS that counts its calls"""
+    monkeypatch.setenv("TTS_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.delenv("TTS_OUTPUT_DIR", raising=False)
+    server = OnlineTextToSpeechServer()
+    server.available_services["gtts"] = {"module": None}
+    server.calls = []
+    server.release = None
+    
+    async def fake_synthesize(service, text, output_file, *args):
+        server.calls.append(text)
+        if server.release is not None:
+            await server.release.wait()
+        with open(output_file, "wb") as f:
+            f.write(b"audio:" + text.encode())
+        return os.path.getsize(output_file)
+    
+    server._synthesize_with_service = fake_synthesize
+    yield server
+    if server._http is not None:
+        asyncio.run(server._http.aclose())
+
+async def _synthesize(server, **arguments):
+    """Call synthesize_speech_online and parse its response"""
+    result = await server._synthesize_speech_online({"text": "hello world", "service": "gtts", **arguments})
+    return json.loads(result[0].text)
+
+def test_audio_cache_hit(online_server, tmp_path):
+    """A repeated request is served from the cache without calling the service"""
+    async def run():
+        first = await _synthesize(online_server, output_file=str(tmp_path / "a.mp3"))
+        second = await _synthesize(online_server, output_file=str(tmp_path / "b.mp3"))
+        default = await _synthesize(online_server)
+        return first, second, default
+    
+    first, second, default = asyncio.run(run())
+    
+    assert (first["status"], first["cached"]) == ("success", False)
+    assert (second["status"], second["cached"]) == ("success", True)
+    assert default["cached"] is True
+    assert online_server.calls == ["hello world"]
+    # Caller-chosen paths are copies, never hardlinks to the cache entry
+    assert (tmp_path / "b.mp3").read_bytes() == b"audio:hello world"
+    assert os.stat(tmp_path / "b.mp3").st_nlink == 1
+    # Without an output_file the result is the cache entry itself
+    assert os.path.dirname(default["output_file"]) == online_server.audio_cache.cache_dir
+
+def test_audio_cache_restore_after_prune(tmp_path):
+    """Audio pruned from disk is restored from memory, and disk entries survive a restart"""
+    cache_dir = str(tmp_path / "cache")
+    cache = AudioCache(cache_dir, max_disk_bytes=10)
+    for key in ("old", "new"):
+        source = tmp_path / f"{key}.mp3"
+        source.write_bytes(key.encode() * 2)
+        cache.put(key, str(source))
+        if key == "old":
+            os.utime(cache.path_for(key), (0, 0))
+    
+    assert not os.path.exists(cache.path_for("old"))
+    assert cache.disk_bytes <= 10
+    
+    output_file = str(tmp_path / "restored.mp3")
+    audio = cache.get("old")
+    cache.restore("old", audio, output_file)
+    with open(output_file, "rb") as f:
+        assert f.read() == b"oldold"
+    
+    restarted = AudioCache(cache_dir, max_disk_bytes=10)
+    assert restarted.get("new") == b"newnew"
+    assert restarted.get("old") is None
+
+def test_synthesis_cache_copies_and_survives_restart(tmp_path):
+    """Entries are copies of the source, survive a restart and are evicted least recently used first"""
+    cache_dir = str(tmp_path / "cache")
+    cache = SynthesisCache(cache_dir, max_entries=2)
+    for key in ("a", "b"):
+        source = tmp_path / f"{key}.wav"
+        source.write_bytes(key.encode())
+        cache.put(key, str(source))
+    (tmp_path / "a.wav").write_bytes(b"changed in place")
+    assert open(cache.get("a"), "rb").read() == b"a"
+    
+    # A synthesis still being written isn't picked up as an entry
+    (tmp_path / "cache" / "c.1234abcd.part").write_bytes(b"partial")
+    restarted = SynthesisCache(cache_dir, max_entries=2)
+    assert restarted.get("b") is not None
+    assert restarted.get("c") is None
+    
+    source = tmp_path / "d.wav"
+    source.write_bytes(b"d")
+    restarted.put("d", str(source))
+    assert restarted.get("a") is None
+    assert restarted.get("d") is not None
+
+def test_concurrent_requests_share_one_call(online_server, tmp_path):
+    """Identical concurrent requests make one service call between them"""
+    async def run():
+        return await asyncio.gather(*(
+            _synthesize(online_server, output_file=str(tmp_path / f"out_{i}.mp3")) for i in range(3)
+        ))
+    
+    results = asyncio.run(run())
+    
+    assert [r["status"] for r in results] == ["success"] * 3
+    assert online_server.calls == ["hello world"]
+    for i in range(3):
+        assert (tmp_path / f"out_{i}.mp3").read_bytes() == b"audio:hello world"
+
+def test_cancelled_caller_does_not_fail_the_others(online_server, tmp_path):
+    """Cancelling the caller that started a synthesis leaves it running for the rest"""
+    async def run():
+        online_server.release = asyncio.Event()
+        first = asyncio.create_task(_synthesize(online_server, output_file=str(tmp_path / "first.mp3")))
+        while not online_server.calls:
+            await asyncio.sleep(0)
+        others = [
+            asyncio.create_task(_synthesize(online_server, output_file=str(tmp_path / f"out_{i}.mp3")))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0)
+        first.cancel()
+        online_server.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await asyncio.gather(*others)
+    
+    results = asyncio.run(run())
+    
+    assert [r["status"] for r in results] == ["success", "success"]
+    assert online_server.calls == ["hello world"]
+    assert (tmp_path / "out_1.mp3").read_bytes() == b"audio:hello world"
@@ -0,0 +1,48 @@
+"""
+Tests for the helpers shared by the offline and online servers
+"""
+
+import os
+
+from mcp_text_to_speech.utils import chunk_text, copy_file
+
+def test_chunk_text_keeps_short_text_whole():
+    """Text under the limit comes back as a single chunk"""
+    assert chunk_text("Hello there. How are you?", 150) == ["Hello there. How are you?"]
+    assert chunk_text("", 150) == []
+
+def test_chunk_text_splits_at_sentence_ends():
+    """Sentences are packed into chunks without exceeding max_chars"""
+    chunks = chunk_text("One two. Three four. Five six.", 20)
+    assert chunks == ["One two. Three four.", "Five six."]
+    assert all(len(chunk) <= 20 for chunk in chunks)
+
+def test_chunk_text_keeps_decimals_whole():
+    """A period without trailing whitespace (3.14) doesn't end a sentence"""
+    assert chunk_text("Pi is 3.14 exactly. Next one.", 19) == ["Pi is 3.14 exactly.", "Next one."]
+
+def test_chunk_text_splits_cjk_without_spaces():
+    """CJK terminators end sentences without whitespace, and chunks are joined without spaces"""
+    text = "你好。今天天氣很好！我們去公園吧？"
+    assert chunk_text(text, 100) == [text]
+    assert chunk_text(text, 8) == ["你好。", "今天天氣很好！", "我們去公園吧？"]
+
+def test_chunk_text_long_sentences():
+    """Over-long sentences stay whole unless split_long is set"""
+    assert chunk_text("aaaa bbbb cccc", 9) == ["aaaa bbbb cccc"]
+    assert chunk_text("aaaa bbbb cccc", 9, split_long=True) == ["aaaa bbbb", "cccc"]
+    # Without spaces to cut at, the sentence is cut at max_chars
+    assert chunk_text("abcdefghij", 4, split_long=True) == ["abcd", "efgh", "ij"]
+
+def test_copy_file_is_independent_of_its_source(tmp_path):
+    """Copies don't share an inode with the source, and replace an existing destination"""
+    source = tmp_path / "source.wav"
+    dest = tmp_path / "dest.wav"
+    source.write_bytes(b"new audio")
+    dest.write_bytes(b"old")
+    
+    copy_file(str(source), str(dest))
+    
+    assert dest.read_bytes() == b"new audio"
+    assert os.stat(dest).st_nlink == 1
+    assert sorted(os.listdir(tmp_path)) == ["dest.wav", "source.wav"]